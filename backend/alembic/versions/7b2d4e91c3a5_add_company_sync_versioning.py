@@ -0,0 +1,79 @@
+"""Add row versioning and tombstones for incremental sync
+
+Revision ID: 7b2d4e91c3a5
+Revises: 30c106c2abd2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7b2d4e91c3a5"
+down_revision = "30c106c2abd2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE IF NOT EXISTS companies_row_version_seq")
+
+    # Existing rows each draw a version from the volatile default
+    op.add_column(
+        "companies",
+        sa.Column(
+            "row_version",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('companies_row_version_seq')"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        op.f("ix_companies_row_version"), "companies", ["row_version"], unique=False
+    )
+
+    op.create_table(
+        "company_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "row_version",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('companies_row_version_seq')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_company_tombstones_company_id"),
+        "company_tombstones",
+        ["company_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_company_tombstones_row_version"),
+        "company_tombstones",
+        ["row_version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_company_tombstones_row_version"), table_name="company_tombstones"
+    )
+    op.drop_index(
+        op.f("ix_company_tombstones_company_id"), table_name="company_tombstones"
+    )
+    op.drop_table("company_tombstones")
+    op.drop_index(op.f("ix_companies_row_version"), table_name="companies")
+    op.drop_column("companies", "row_version")
+    op.execute("DROP SEQUENCE IF EXISTS companies_row_version_seq")
@@ -0,0 +1,81 @@
+"""Add company dedup key and idempotency keys
+
+Revision ID: c41f8a2d6e07
+Revises: 7b2d4e91c3a5
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from app.company_keys import DEDUP_PRECISION
+
+
+# revision identifiers, used by Alembic.
+revision = "c41f8a2d6e07"
+down_revision = "7b2d4e91c3a5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("companies", sa.Column("dedup_key", sa.String(), nullable=True))
+
+    # Backfill with the same normalisation as make_dedup_key; where existing
+    # rows already collide, only the oldest gets the key
+    op.execute(
+        sa.text(
+            """
+            UPDATE companies c
+            SET dedup_key = k.dedup_key
+            FROM (
+                SELECT id, dedup_key,
+                       row_number() OVER (PARTITION BY dedup_key ORDER BY id) AS rn
+                FROM (
+                    SELECT id,
+                           lower(regexp_replace(
+                               regexp_replace(name, '^\\s+|\\s+$', '', 'g'),
+                               '\\s+', ' ', 'g'
+                           ))
+                           || '|' || round(latitude::numeric, :precision)::text
+                           || '|' || round(longitude::numeric, :precision)::text
+                               AS dedup_key
+                    FROM companies
+                ) keys
+            ) k
+            WHERE c.id = k.id AND k.rn = 1
+            """
+        ).bindparams(precision=DEDUP_PRECISION)
+    )
+    op.create_index(
+        op.f("ix_companies_dedup_key"), "companies", ["dedup_key"], unique=True
+    )
+
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=False),
+        sa.Column("response_body", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_idempotency_keys_expires_at"),
+        "idempotency_keys",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_idempotency_keys_expires_at"), table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
+    op.drop_index(op.f("ix_companies_dedup_key"), table_name="companies")
+    op.drop_column("companies", "dedup_key")
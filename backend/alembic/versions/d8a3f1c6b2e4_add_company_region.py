@@ -0,0 +1,63 @@
+"""Add company region
+
+Revision ID: d8a3f1c6b2e4
+Revises: c41f8a2d6e07
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from app.company_keys import DEDUP_PRECISION
+
+
+# revision identifiers, used by Alembic.
+revision = "d8a3f1c6b2e4"
+down_revision = "c41f8a2d6e07"
+branch_labels = None
+depends_on = None
+
+# Same cell as company_region: the one-character geohash of the snapped point
+REGION_SQL = """
+    WITH bins AS (
+        SELECT id,
+               LEAST(GREATEST(floor(
+                   (round(longitude::numeric, :precision) + 180) / 45
+               )::int, 0), 7) AS lon_bin,
+               LEAST(GREATEST(floor(
+                   (round(latitude::numeric, :precision) + 90) / 45
+               )::int, 0), 3) AS lat_bin
+        FROM companies
+    )
+    UPDATE companies c
+    SET region = ((b.lon_bin >> 2) & 1) << 4
+               | ((b.lat_bin >> 1) & 1) << 3
+               | ((b.lon_bin >> 1) & 1) << 2
+               | (b.lat_bin & 1) << 1
+               | (b.lon_bin & 1)
+    FROM bins b
+    WHERE c.id = b.id
+"""
+
+
+def upgrade() -> None:
+    op.add_column("companies", sa.Column("region", sa.SmallInteger(), nullable=True))
+    op.execute(sa.text(REGION_SQL).bindparams(precision=DEDUP_PRECISION))
+    op.alter_column("companies", "region", nullable=False)
+
+    # Unique indexes on a partitioned table must include the partition key
+    op.drop_index(op.f("ix_companies_dedup_key"), table_name="companies")
+    op.create_index(
+        op.f("ix_companies_dedup_key"),
+        "companies",
+        ["dedup_key", "region"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_companies_dedup_key"), table_name="companies")
+    op.create_index(
+        op.f("ix_companies_dedup_key"), "companies", ["dedup_key"], unique=True
+    )
+    op.drop_column("companies", "region")
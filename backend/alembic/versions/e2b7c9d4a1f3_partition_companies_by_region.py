@@ -0,0 +1,116 @@
+"""Optionally partition companies by region
+
+Revision ID: e2b7c9d4a1f3
+Revises: d8a3f1c6b2e4
+Create Date: 2026-10-19 15:30:00.000000
+
+Only takes effect when run with ``alembic -x partitions=N upgrade head``,
+where N is 2, 4, 8, 16 or 32; otherwise the table is left as it is. Each
+partition holds an equal range of the 32 geohash regions, so neighbouring
+regions share a partition. Converting rewrites the whole table under an
+exclusive lock.
+
+To partition a database that is already at head, downgrade to d8a3f1c6b2e4
+first; the downgrade of an unpartitioned table does nothing.
+
+"""
+
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+from app.company_keys import REGION_COUNT
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b7c9d4a1f3"
+down_revision = "d8a3f1c6b2e4"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+PARTITION_COUNTS = (2, 4, 8, 16, 32)
+
+INDEXES = (
+    "CREATE INDEX idx_companies_geom ON companies USING gist (geom)",
+    "CREATE INDEX ix_companies_id ON companies (id)",
+    "CREATE INDEX ix_companies_name ON companies (name)",
+    "CREATE INDEX ix_companies_row_version ON companies (row_version)",
+    "CREATE UNIQUE INDEX ix_companies_dedup_key ON companies (dedup_key, region)",
+)
+
+
+def _requested_partitions():
+    value = context.get_x_argument(as_dictionary=True).get("partitions")
+    if value is None:
+        return None
+    partitions = int(value)
+    if partitions not in PARTITION_COUNTS:
+        raise ValueError(
+            f"partitions must be one of {', '.join(map(str, PARTITION_COUNTS))}"
+        )
+    return partitions
+
+
+def _is_partitioned():
+    return (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = 'companies'::regclass)"
+            )
+        )
+        .scalar()
+    )
+
+
+def _rebuild(partitions=None):
+    """
+    Copy companies into a new table, partitioned by region unless None.
+    """
+    op.execute("ALTER TABLE companies RENAME TO companies_old")
+    partition_clause = " PARTITION BY RANGE (region)" if partitions else ""
+    op.execute(
+        "CREATE TABLE companies (LIKE companies_old INCLUDING DEFAULTS "
+        f"INCLUDING CONSTRAINTS INCLUDING STORAGE){partition_clause}"
+    )
+    if partitions:
+        width = REGION_COUNT // partitions
+        for i in range(partitions):
+            op.execute(
+                f"CREATE TABLE companies_p{i} PARTITION OF companies "
+                f"FOR VALUES FROM ({i * width}) TO ({(i + 1) * width})"
+            )
+
+    op.execute("INSERT INTO companies SELECT * FROM companies_old")
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE companies_id_seq OWNED BY companies.id")
+    op.execute("DROP TABLE companies_old")
+
+    # Primary keys on a partitioned table must include the partition key
+    primary_key = "id, region" if partitions else "id"
+    op.execute(
+        f"ALTER TABLE companies ADD CONSTRAINT companies_pkey "
+        f"PRIMARY KEY ({primary_key})"
+    )
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute("ANALYZE companies")
+
+
+def upgrade() -> None:
+    partitions = _requested_partitions()
+    if partitions is None:
+        logger.info("Leaving companies unpartitioned; pass -x partitions=N to split")
+        return
+    if _is_partitioned():
+        logger.info("companies is already partitioned")
+        return
+    _rebuild(partitions)
+
+
+def downgrade() -> None:
+    if _is_partitioned():
+        _rebuild()
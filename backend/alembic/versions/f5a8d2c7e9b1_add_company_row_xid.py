@@ -0,0 +1,40 @@
+"""Record the transaction that wrote each row version
+
+Revision ID: f5a8d2c7e9b1
+Revises: e2b7c9d4a1f3
+Create Date: 2026-10-20 09:00:00.000000
+
+Versions drawn from the sequence can commit out of order: a transaction
+holding version 10 may still be open when one holding 11 commits, and a
+client syncing in between would never see 10. Storing the writing
+transaction's ID lets sync hold back versions written by transactions that
+may still be running alongside earlier ones, without making writers wait
+for each other.
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f5a8d2c7e9b1"
+down_revision = "e2b7c9d4a1f3"
+branch_labels = None
+depends_on = None
+
+TABLES = ("companies", "company_tombstones")
+
+
+def upgrade() -> None:
+    # Existing rows get this migration's transaction ID, which is settled
+    # as soon as it commits
+    for table in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN row_xid xid8 "
+            "NOT NULL DEFAULT pg_current_xact_id()"
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN row_xid")
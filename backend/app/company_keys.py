@@ -0,0 +1,157 @@
+"""
+Deduplication keys and regions of companies, and the regions a search
+area can reach.
+
+Plain functions with no model or database imports, so the bulk loader and
+migrations can compute the same values as the ORM model without depending
+on its current shape.
+"""
+
+import math
+import os
+from decimal import ROUND_HALF_UP, Decimal
+
+
+# Decimal places coordinates are snapped to when detecting duplicates
+DEDUP_PRECISION = int(os.getenv("COMPANY_DEDUP_PRECISION", "4"))
+
+
+def snap_coordinate(value, precision=DEDUP_PRECISION):
+    """
+    Round a coordinate the way PostgreSQL rounds ``numeric``, as text.
+    """
+    snapped = Decimal(repr(float(value))).quantize(
+        Decimal(1).scaleb(-precision), rounding=ROUND_HALF_UP
+    )
+    # Avoid "-0.0000", which PostgreSQL never produces
+    return str(abs(snapped) if snapped == 0 else snapped)
+
+
+def make_dedup_key(name, latitude, longitude, precision=DEDUP_PRECISION):
+    """
+    Build the deduplication key for a company.
+
+    Names are compared case-insensitively with whitespace collapsed, and
+    coordinates are snapped to ``precision`` decimal places.
+    """
+    normalised_name = " ".join(name.split()).lower()
+    return (
+        f"{normalised_name}|"
+        f"{snap_coordinate(latitude, precision)}|"
+        f"{snap_coordinate(longitude, precision)}"
+    )
+
+
+# Companies are bucketed into the 32 one-character geohash cells, each 45
+# degrees of longitude by 45 of latitude; partitioned deployments split the
+# table on this value
+REGION_COUNT = 32
+
+
+def _lon_bin(longitude):
+    return min(max(int((longitude + 180) // 45), 0), 7)
+
+
+def _lat_bin(latitude):
+    return min(max(int((latitude + 90) // 45), 0), 3)
+
+
+def company_region(latitude, longitude, precision=DEDUP_PRECISION):
+    """
+    Return the index (0-31) of the one-character geohash cell of a point.
+
+    The point is snapped like the dedup key first, so companies sharing a
+    dedup key always share a region.
+    """
+    latitude = float(snap_coordinate(latitude, precision))
+    longitude = float(snap_coordinate(longitude, precision))
+    lon_bin = _lon_bin(longitude)
+    lat_bin = _lat_bin(latitude)
+    # Geohash interleaves bits starting with longitude: lon, lat, lon, lat, lon
+    return (
+        (lon_bin >> 2 & 1) << 4
+        | (lat_bin >> 1 & 1) << 3
+        | (lon_bin >> 1 & 1) << 2
+        | (lat_bin & 1) << 1
+        | (lon_bin & 1)
+    )
+
+
+def regions_for_bounds(west, south, east, north, precision=DEDUP_PRECISION):
+    """
+    Return the regions that may hold points inside a bounding box.
+
+    A box with west > east crosses the antimeridian, as in GeoJSON. The box
+    is widened by half a snapping step so points snapped across a cell edge
+    are still covered.
+    """
+    margin = 0.5 * 10**-precision
+    ranges = [(west, east)] if west <= east else [(west, 180), (-180, east)]
+    lon_bins = set()
+    for range_west, range_east in ranges:
+        lon_bins.update(
+            range(_lon_bin(range_west - margin), _lon_bin(range_east + margin) + 1)
+        )
+        # Longitudes 180 and -180 are the same meridian but fall in different
+        # cells
+        if range_east + margin >= 180:
+            lon_bins.add(0)
+        if range_west - margin <= -180:
+            lon_bins.add(7)
+    lat_bins = range(_lat_bin(south - margin), _lat_bin(north + margin) + 1)
+    return sorted(
+        company_region(lat_bin * 45 - 90, lon_bin * 45 - 180, precision)
+        for lon_bin in lon_bins
+        for lat_bin in lat_bins
+    )
+
+
+def geodesic_bounds(ring):
+    """
+    Return a (west, south, east, north) box containing a polygon ring on the sphere.
+
+    Edges are great-circle arcs and take the short way round, so an edge
+    whose longitudes differ by more than 180 degrees crosses the
+    antimeridian and the box then has west > east. Arcs also bow towards
+    the poles, so the latitude range is widened by an upper bound on each
+    edge's bulge. A ring that winds around a pole gets the whole globe.
+    """
+    positions = [position[:2] for position in ring]
+    south = min(latitude for _, latitude in positions)
+    north = max(latitude for _, latitude in positions)
+
+    # Follow the ring with unwrapped longitudes, so crossing the antimeridian
+    # extends the range instead of jumping across the globe
+    start = longitude = low = high = positions[0][0]
+    over_pole = False
+    for (lon1, lat1), (lon2, lat2) in zip(positions, positions[1:]):
+        delta = (lon2 - lon1 + 180) % 360 - 180
+        span = abs(delta)
+        # Offset the vertex by whole turns rather than summing deltas, so
+        # rounding cannot drift the range
+        longitude = lon2 + 360 * round((longitude + delta - lon2) / 360)
+        low, high = min(low, longitude), max(high, longitude)
+
+        if span >= 180:
+            # Opposite meridians: the arc runs over a pole
+            over_pole = True
+            extreme = 90.0
+        else:
+            extreme = math.degrees(
+                math.atan(
+                    math.tan(math.radians(max(abs(lat1), abs(lat2))))
+                    / math.cos(math.radians(span / 2))
+                )
+            )
+        if lat1 + lat2 >= 0:
+            north = max(north, extreme)
+        if lat1 + lat2 <= 0:
+            south = min(south, -extreme)
+
+    if abs(longitude - start) >= 180:
+        return -180.0, -90.0, 180.0, 90.0
+    if over_pole or high - low >= 360:
+        return -180.0, south, 180.0, north
+    if -180 <= low and high <= 180:
+        return low, south, high, north
+    return (low + 180) % 360 - 180, south, (high + 180) % 360 - 180, north
@@ -0,0 +1,324 @@
+"""
+Bulk loading of company datasets from CSV and GeoJSON files.
+
+Rows are streamed from the file, sent to a temporary staging table with
+``COPY`` in chunks, and moved into ``companies`` with a single
+``INSERT ... SELECT ... ON CONFLICT (dedup_key, region) DO NOTHING`` per
+chunk, so loads can be re-run safely. Migrations that run before the dedup key exists
+fall back to an anti-join on name and coordinates. Everything runs on the
+caller's connection and transaction, which lets Alembic migrations use it
+with ``op.get_bind()``.
+
+Usage:
+    python -m app.dataload data/seed_companies.csv [--chunk-size 50000]
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+from app.company_keys import company_region, make_dedup_key
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50000
+FIELDS = ("name", "industry", "location", "latitude", "longitude")
+
+_STAGING_TABLE = "companies_staging"
+
+
+def read_csv(path):
+    """
+    Yield company rows from a CSV file with a header row.
+
+    Args:
+        path: Path to a CSV file with name, industry, location, latitude
+            and longitude columns
+
+    Yields:
+        Dictionaries of company fields
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {field: row.get(field) for field in FIELDS}
+
+
+def read_geojson(path):
+    """
+    Yield company rows from a GeoJSON FeatureCollection of Points.
+
+    Coordinates come from the geometry; the other fields from properties.
+
+    Args:
+        path: Path to a GeoJSON file
+
+    Yields:
+        Dictionaries of company fields
+    """
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    for feature in collection.get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            raise ValueError(f"Unsupported geometry type: {geometry.get('type')}")
+        longitude, latitude = geometry["coordinates"][:2]
+        properties = feature.get("properties") or {}
+        yield {
+            "name": properties.get("name"),
+            "industry": properties.get("industry"),
+            "location": properties.get("location"),
+            "latitude": latitude,
+            "longitude": longitude,
+        }
+
+
+def read_file(path):
+    """
+    Yield company rows from a CSV or GeoJSON file, chosen by extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv(path)
+    if extension in (".geojson", ".json"):
+        return read_geojson(path)
+    raise ValueError(f"Unsupported data file: {path}")
+
+
+def _clean_row(row, number):
+    """Validate a row and coerce its coordinates, mirroring CompanyBase."""
+    for field in ("name", "industry", "location"):
+        if not row.get(field):
+            raise ValueError(f"Row {number}: missing {field}")
+    try:
+        latitude = float(row["latitude"])
+        longitude = float(row["longitude"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Row {number}: invalid coordinates")
+    if not -90 <= latitude <= 90:
+        raise ValueError(f"Row {number}: latitude must be between -90 and 90 degrees")
+    if not -180 <= longitude <= 180:
+        raise ValueError(
+            f"Row {number}: longitude must be between -180 and 180 degrees"
+        )
+    return (
+        row["name"],
+        row["industry"],
+        row["location"],
+        latitude,
+        longitude,
+        make_dedup_key(row["name"], latitude, longitude),
+        company_region(latitude, longitude),
+    )
+
+
+def _copy_escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_buffer(rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_escape(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def _target_columns(connection):
+    """Columns of companies as they exist at this point in the migrations."""
+    result = connection.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'companies' AND table_schema = current_schema()"
+        )
+    )
+    return {row[0] for row in result}
+
+
+def _insert_statement(skip_existing, has_dedup_key, has_region=False):
+    """Build the statement that moves a staged chunk into companies."""
+    columns = ["name", "industry", "location", "latitude", "longitude", "geom"]
+    values = [
+        "s.name",
+        "s.industry",
+        "s.location",
+        "s.latitude",
+        "s.longitude",
+        "ST_SetSRID(ST_MakePoint(s.longitude, s.latitude), 4326)::geography",
+    ]
+    if has_dedup_key:
+        columns.append("dedup_key")
+        values.append("s.dedup_key")
+    if has_region:
+        columns.append("region")
+        values.append("s.region")
+
+    # Only idempotent loads collapse duplicates within a chunk; the others
+    # skip the sort
+    distinct = "DISTINCT ON (s.dedup_key) " if skip_existing else ""
+    statement = f"""
+        INSERT INTO companies ({", ".join(columns)})
+        SELECT {distinct}{", ".join(values)}
+        FROM {_STAGING_TABLE} s
+    """
+    if skip_existing and has_dedup_key:
+        # The unique index covers region once that column exists
+        conflict_target = "dedup_key, region" if has_region else "dedup_key"
+        statement += f"ON CONFLICT ({conflict_target}) DO NOTHING"
+    elif skip_existing:
+        statement += """
+        WHERE NOT EXISTS (
+            SELECT 1 FROM companies c
+            WHERE c.name = s.name
+              AND c.latitude = s.latitude
+              AND c.longitude = s.longitude
+        )
+        """
+    return statement
+
+
+def load_companies(
+    connection,
+    rows,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    skip_existing=True,
+    progress=None,
+):
+    """
+    Bulk-load company rows into PostgreSQL/PostGIS.
+
+    Args:
+        connection: SQLAlchemy connection; the load joins its transaction
+        rows: Iterable of dictionaries with company fields
+        chunk_size: Number of rows staged and inserted at a time
+        skip_existing: Skip companies that already exist or repeat within
+            the file, which makes the load idempotent; without it the rows
+            are inserted as they are and a duplicate dedup key fails the load
+        progress: Optional callable receiving (rows read, rows inserted)
+            after each chunk
+
+    Returns:
+        Tuple of (rows read, rows inserted)
+    """
+    if connection.dialect.name != "postgresql":
+        raise ValueError("Bulk loading requires PostgreSQL with PostGIS")
+
+    connection.execute(
+        text(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} (
+                name text,
+                industry text,
+                location text,
+                latitude double precision,
+                longitude double precision,
+                dedup_key text,
+                region smallint
+            ) ON COMMIT DROP
+            """
+        )
+    )
+    target_columns = _target_columns(connection)
+    insert = text(
+        _insert_statement(
+            skip_existing, "dedup_key" in target_columns, "region" in target_columns
+        )
+    )
+    # COPY needs the DBAPI cursor; it shares the connection's transaction
+    cursor = connection.connection.dbapi_connection.cursor()
+
+    read = inserted = 0
+    chunk = []
+
+    def flush():
+        nonlocal inserted
+        connection.execute(text(f"TRUNCATE {_STAGING_TABLE}"))
+        cursor.copy_expert(
+            f"COPY {_STAGING_TABLE} ({', '.join(FIELDS)}, dedup_key, region) "
+            "FROM STDIN",
+            _copy_buffer(chunk),
+        )
+        inserted += connection.execute(insert).rowcount
+        chunk.clear()
+        if progress is not None:
+            progress(read, inserted)
+
+    try:
+        for row in rows:
+            read += 1
+            chunk.append(_clean_row(row, read))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        cursor.close()
+
+    return read, inserted
+
+
+def load_companies_file(connection, path, **kwargs):
+    """
+    Bulk-load companies from a CSV or GeoJSON file.
+
+    Args:
+        connection: SQLAlchemy connection; the load joins its transaction
+        path: Path to the data file
+        **kwargs: Passed through to load_companies
+
+    Returns:
+        Tuple of (rows read, rows inserted)
+    """
+    return load_companies(connection, read_file(path), **kwargs)
+
+
+def log_progress(read, inserted):
+    """Progress callback that reports through the module logger."""
+    logger.info("Loaded %d rows (%d new)", read, inserted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--allow-duplicates",
+        action="store_true",
+        help="Skip the existence check; faster, but fails on duplicates",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from app.database import engine
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        read, inserted = load_companies_file(
+            connection,
+            args.path,
+            chunk_size=args.chunk_size,
+            skip_existing=not args.allow_duplicates,
+            progress=log_progress,
+        )
+        connection.execute(text("ANALYZE companies"))
+    elapsed = time.perf_counter() - start
+    logger.info("Done: %d rows read, %d inserted in %.1fs", read, inserted, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Idempotency-Key support for create requests.
+
+A client may send an ``Idempotency-Key`` header with a create. The first
+response for that key is stored for ``IDEMPOTENCY_KEY_TTL_SECONDS``; retries
+with the same key and payload get the stored response back instead of
+creating another company, and reusing a key for a different payload is
+rejected.
+"""
+
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.models.idempotency import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+
+# Share of stores that also sweep out expired keys
+_PURGE_PROBABILITY = 0.01
+
+
+def request_hash(payload):
+    """
+    Fingerprint a request payload so key reuse with other data is detectable.
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def get_stored_response(db: Session, key):
+    """
+    Look up the live stored response for a key.
+
+    Returns:
+        The IdempotencyKey record, or None if there is none or it has expired
+    """
+    record = db.get(IdempotencyKey, key)
+    if record is None:
+        return None
+    if _as_utc(record.expires_at) <= datetime.now(timezone.utc):
+        db.delete(record)
+        db.flush()
+        return None
+    return record
+
+
+def add_stored_response(db: Session, key, payload_hash, status_code, body):
+    """
+    Stage a response for a key in the caller's transaction.
+
+    Committing it together with the create makes the pair atomic: a
+    concurrent request with the same key fails on the primary key instead
+    of creating a second company.
+    """
+    now = datetime.now(timezone.utc)
+    db.add(
+        IdempotencyKey(
+            key=key,
+            request_hash=payload_hash,
+            status_code=status_code,
+            response_body=body,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+        )
+    )
+    if random.random() < _PURGE_PROBABILITY:
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+
+
+def _as_utc(value):
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -2,18 +2,44 @@
 Main FastAPI application entry point.
 """
 
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import os
 from dotenv import load_dotenv
 
+from . import metrics, slow_queries, write_behind
 from .database import engine, Base
-from .routes import companies
+from .routes import admin, companies
 
 # Load environment variables
 load_dotenv()
 
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Application startup and shutdown hooks.
+    """
+    if write_behind.WRITE_BEHIND_ENABLED:
+        await write_behind.write_behind_queue.start()
+
+    yield
+
+    # In-flight requests have drained by now; flush queued writes, then
+    # close pooled connections
+    if write_behind.WRITE_BEHIND_ENABLED:
+        await write_behind.write_behind_queue.stop()
+    engine.dispose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Geo-Tagging Company API",
@@ -21,6 +47,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 
@@ -32,6 +59,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request metrics and profiling, exposed at /metrics
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.add_api_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+
+# Opt-in slow-query log, listed at /api/admin/slow-queries when an admin
+# token is configured
+if slow_queries.SLOW_QUERY_THRESHOLD_MS > 0:
+    slow_queries.instrument_engine(engine)
+    if admin.ADMIN_TOKEN:
+        app.include_router(admin.router)
+    else:
+        logger.warning("ADMIN_TOKEN is not set; /api/admin endpoints are disabled")
+
 # Include routers
 app.include_router(companies.router)
 
@@ -62,7 +104,11 @@ async def http_exception_handler(request, exc):
     """
     Global HTTP exception handler.
     """
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),
+    )
 
 
 @app.exception_handler(Exception)
@@ -79,4 +125,12 @@ if __name__ == "__main__":
     host = os.getenv("BACKEND_HOST", "0.0.0.0")
     port = int(os.getenv("BACKEND_PORT", "8000"))
 
-    uvicorn.run("app.main:app", host=host, port=port, reload=True)
+    # Production should run under Gunicorn (see gunicorn.conf.py); this is
+    # mainly for local development
+    uvicorn.run(
+        "app.main:app",
+        host=host,
+        port=port,
+        reload=DEBUG,
+        workers=None if DEBUG else int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
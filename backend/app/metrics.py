@@ -0,0 +1,410 @@
+"""
+Request profiling and Prometheus-format metrics.
+
+Everything in this module is opt-in via ``METRICS_ENABLED``; when it is off
+the middleware, engine hooks and ``/metrics`` endpoint are not installed.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+from app.query_timing import on_statement
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Fraction of requests to profile, and the minimum duration worth keeping
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MIN_DURATION_MS = float(os.getenv("PROFILE_MIN_DURATION_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILER = os.getenv("PROFILER", "cprofile")
+
+# Identical statements repeated this many times in one request count as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus exposition format.
+    """
+
+    def __init__(self, name, description, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(
+                label_values, [[0] * len(self.buckets), 0.0, 0]
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                labels = _format_labels(self.labels, label_values)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    bucket_labels = _format_labels(
+                        self.labels + ("le",), label_values + (_format_value(bound),)
+                    )
+                    lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+                inf_labels = _format_labels(
+                    self.labels + ("le",), label_values + ("+Inf",)
+                )
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CounterMetric:
+    """
+    Monotonic counter in the Prometheus exposition format.
+    """
+
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._series = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] += amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for label_values, value in sorted(self._series.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+                )
+        return lines
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+REQUEST_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route.",
+    REQUEST_LABELS,
+)
+requests_total = CounterMetric(
+    "http_requests_total",
+    "Requests by route and status code.",
+    REQUEST_LABELS + ("status",),
+)
+request_sql_queries = Histogram(
+    "http_request_sql_queries",
+    "SQL statements executed per request.",
+    REQUEST_LABELS,
+    buckets=QUERY_COUNT_BUCKETS,
+)
+request_sql_duration = Histogram(
+    "http_request_sql_duration_seconds",
+    "Time spent in SQL per request.",
+    REQUEST_LABELS,
+)
+serialization_duration = Histogram(
+    "http_response_serialization_seconds",
+    "Time from the endpoint returning to the response starting.",
+    REQUEST_LABELS,
+)
+n_plus_one_total = CounterMetric(
+    "http_request_n_plus_one_total",
+    "Requests that repeated an identical SQL statement past the N+1 threshold.",
+    REQUEST_LABELS,
+)
+query_duration = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency by operation.",
+    ("operation",),
+)
+# Outcomes are "leader", "shared" and "cached"; see app.singleflight
+single_flight_requests = CounterMetric(
+    "http_single_flight_requests_total",
+    "Coalesced read requests by outcome.",
+    ("outcome",),
+)
+
+ALL_METRICS = (
+    request_duration,
+    requests_total,
+    request_sql_queries,
+    request_sql_duration,
+    serialization_duration,
+    n_plus_one_total,
+    query_duration,
+    single_flight_requests,
+)
+
+
+class RequestStats:
+    """
+    Per-request accumulator for SQL and serialisation timings.
+    """
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.endpoint_finished = None
+        self.response_started = None
+
+    def record_query(self, statement, elapsed):
+        self.sql_count += 1
+        self.sql_time += elapsed
+        self.statements[statement] += 1
+
+
+_current_request = contextvars.ContextVar("current_request_stats", default=None)
+
+
+def _record_query(conn, cursor, statement, parameters, executemany, elapsed):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    query_duration.observe(elapsed, operation)
+
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+
+
+def instrument_engine(engine):
+    """
+    Attach SQL timing hooks to an engine.
+
+    Args:
+        engine: SQLAlchemy engine to instrument
+    """
+    on_statement(engine, _record_query)
+
+
+def _mark_endpoint_finished(endpoint):
+    """Wrap an endpoint so the request knows when serialisation begins."""
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = _current_request.get()
+                if stats is not None:
+                    stats.endpoint_finished = time.perf_counter()
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats = _current_request.get()
+                if stats is not None:
+                    stats.endpoint_finished = time.perf_counter()
+
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    Route class that timestamps the end of the endpoint body.
+
+    The gap between that and the response starting is reported as
+    serialisation time.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if METRICS_ENABLED:
+            endpoint = _mark_endpoint_finished(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+_profiler_lock = threading.Lock()
+
+
+def _start_profiler():
+    """Start a profiler for a sampled request, or return None."""
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    # Only one profiler can be active per process at a time
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+
+    try:
+        if PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+    except Exception:
+        _profiler_lock.release()
+        logger.exception("Failed to start request profiler")
+        return None
+    return profiler
+
+
+def _finish_profiler(profiler, method, path, duration):
+    """Stop a profiler and dump its output if the request was slow enough."""
+    try:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+
+        if duration * 1000 < PROFILE_MIN_DURATION_MS:
+            return
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+        name = f"{int(time.time() * 1000)}-{method}-{slug}-{int(duration * 1000)}ms"
+        base = os.path.join(PROFILE_DIR, name)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(f"{base}.prof")
+        else:
+            with open(f"{base}.html", "w") as f:
+                f.write(profiler.output_html())
+    except Exception:
+        logger.exception("Failed to write request profile")
+    finally:
+        _profiler_lock.release()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, SQL and serialisation metrics per route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        profiler = _start_profiler()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                stats.response_started = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            _current_request.reset(token)
+
+            method = scope["method"]
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            self._record(method, path, status_code, duration, stats)
+
+            if profiler is not None:
+                _finish_profiler(profiler, method, path, duration)
+
+    @staticmethod
+    def _record(method, path, status_code, duration, stats):
+        request_duration.observe(duration, method, path)
+        requests_total.inc(method, path, str(status_code))
+        request_sql_queries.observe(stats.sql_count, method, path)
+        request_sql_duration.observe(stats.sql_time, method, path)
+
+        if stats.endpoint_finished is not None and stats.response_started is not None:
+            serialization_duration.observe(
+                max(stats.response_started - stats.endpoint_finished, 0.0),
+                method,
+                path,
+            )
+
+        repeated = [
+            (statement, count)
+            for statement, count in stats.statements.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+        if repeated:
+            n_plus_one_total.inc(method, path)
+            statement, count = max(repeated, key=lambda item: item[1])
+            logger.warning(
+                "Possible N+1 on %s %s: statement executed %d times: %s",
+                method,
+                path,
+                count,
+                statement,
+            )
+
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,2 +1,3 @@
 # Models package 
-from .company import *
\ No newline at end of file
+from .company import *
+from .idempotency import *
\ No newline at end of file
@@ -2,12 +2,39 @@
 Company model with geographic data support using PostGIS.
 """
 
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    Sequence,
+    SmallInteger,
+    String,
+)
+from sqlalchemy.sql import func
+from sqlalchemy.types import UserDefinedType
 from geoalchemy2 import Geography
+from app.company_keys import company_region, make_dedup_key
 from app.database import Base
 from geoalchemy2.functions import ST_Point
 
 
+# Shared, monotonically increasing change counter used by the sync endpoint.
+# Every insert, update and delete draws a new value from this sequence.
+row_version_seq = Sequence("companies_row_version_seq", metadata=Base.metadata)
+
+
+class XID8(UserDefinedType):
+    """PostgreSQL 64-bit transaction ID."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "XID8"
+
+
 class Company(Base):
     """
     Company model with geographic coordinates stored as PostGIS geometry.
@@ -25,11 +52,47 @@ class Company(Base):
     # PostGIS geometry column for spatial queries
     geom = Column(Geography(geometry_type="POINT", srid=4326), nullable=False)
 
+    # Normalised name and snapped coordinates; NULL only on later duplicates
+    # of a company created while dedup mode was off
+    dedup_key = Column(String, nullable=True)
+
+    # Geohash cell from company_region; the partition key when partitioned
+    region = Column(SmallInteger, nullable=False)
+
+    # Change counter for incremental sync; bumped on every insert and update
+    row_version = Column(
+        BigInteger,
+        server_default=row_version_seq.next_value(),
+        onupdate=row_version_seq.next_value(),
+        nullable=False,
+        index=True,
+    )
+
+    # Transaction that wrote row_version; sync holds back versions written by
+    # transactions that may still be running alongside earlier ones
+    row_xid = Column(
+        XID8,
+        server_default=func.pg_current_xact_id(),
+        onupdate=func.pg_current_xact_id(),
+        nullable=False,
+    )
+
+    # Unique indexes on a partitioned table must include the partition key;
+    # region follows from the dedup key, so this is still unique per key
+    __table_args__ = (
+        Index("ix_companies_dedup_key", "dedup_key", "region", unique=True),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Create PostGIS point from latitude and longitude
         if self.latitude is not None and self.longitude is not None:
             self.geom = ST_Point(self.longitude, self.latitude)
+            self.region = company_region(self.latitude, self.longitude)
+            if self.name is not None and "dedup_key" not in kwargs:
+                self.dedup_key = make_dedup_key(
+                    self.name, self.latitude, self.longitude
+                )
 
     def __repr__(self):
         return (
@@ -39,3 +102,28 @@ class Company(Base):
             f"latitude={self.latitude}, "
             f"longitude={self.longitude})>"
         )
+
+
+class CompanyTombstone(Base):
+    """
+    Record of a deleted company, kept so sync clients can drop their local copy.
+    """
+
+    __tablename__ = "company_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, nullable=False, index=True)
+    row_version = Column(
+        BigInteger,
+        server_default=row_version_seq.next_value(),
+        nullable=False,
+        index=True,
+    )
+    row_xid = Column(XID8, server_default=func.pg_current_xact_id(), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<CompanyTombstone(company_id={self.company_id}, "
+            f"row_version={self.row_version})>"
+        )
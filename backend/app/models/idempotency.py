@@ -0,0 +1,25 @@
+"""
+Stored responses for idempotent requests.
+"""
+
+from sqlalchemy import JSON, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response recorded for a client-supplied Idempotency-Key, kept until it expires.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key='{self.key}', status_code={self.status_code})>"
@@ -0,0 +1,53 @@
+"""
+Statement timing shared by the metrics and slow-query engine hooks.
+
+Each engine gets one set of cursor-execute listeners, which time every
+statement and hand the duration to the callbacks registered with
+``on_statement``.
+"""
+
+import time
+import weakref
+
+from sqlalchemy import event
+
+
+_callbacks = weakref.WeakKeyDictionary()
+
+
+def on_statement(engine, callback):
+    """
+    Call ``callback`` after every statement the engine executes.
+
+    Args:
+        engine: SQLAlchemy engine to instrument
+        callback: Callable taking (conn, cursor, statement, parameters,
+            executemany, elapsed), with ``elapsed`` in seconds
+    """
+    callbacks = _callbacks.get(engine)
+    if callbacks is None:
+        callbacks = _callbacks[engine] = []
+
+        def after_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            elapsed = time.perf_counter() - conn.info["query_timing_start"].pop()
+            for registered in callbacks:
+                registered(conn, cursor, statement, parameters, executemany, elapsed)
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    if callback not in callbacks:
+        callbacks.append(callback)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_timing_start", []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_timing_start"):
+        connection.info["query_timing_start"].pop()
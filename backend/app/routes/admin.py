@@ -0,0 +1,60 @@
+"""
+Admin and diagnostics API routes.
+"""
+
+import os
+import secrets
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from app.slow_queries import slow_query_log
+from app.schemas.admin import SlowQueryResponse
+
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency that checks the admin token; without one configured it
+    rejects every request, since these endpoints expose query parameters.
+    """
+    if not ADMIN_TOKEN or not secrets.compare_digest(
+        x_admin_token or "", ADMIN_TOKEN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token"
+        )
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.get("/slow-queries", response_model=list[SlowQueryResponse])
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=100),
+    order_by: Literal["total_ms", "max_ms", "mean_ms", "count"] = "total_ms",
+):
+    """
+    List the worst slow statements seen by this process.
+
+    Args:
+        limit: Maximum number of statements to return
+        order_by: Aggregate to rank statements by
+
+    Returns:
+        Slow statements with their timings and captured plans
+    """
+    return slow_query_log.worst(limit=limit, order_by=order_by)
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries():
+    """
+    Reset the slow-query log.
+    """
+    slow_query_log.clear()
@@ -2,42 +2,195 @@
 Companies API routes with CRUD operations.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from contextlib import contextmanager
+from typing import Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from geoalchemy2 import Geography
+from sqlalchemy import (
+    and_,
+    cast,
+    false,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models.company import Company
+from app.idempotency import add_stored_response, get_stored_response, request_hash
+from app.metrics import InstrumentedRoute
+from app.singleflight import single_flight
+from app.write_behind import (
+    WRITE_BEHIND_ENABLED,
+    QueueClosedError,
+    QueueFullError,
+    write_behind_queue,
+)
+from app.company_keys import (
+    company_region,
+    geodesic_bounds,
+    make_dedup_key,
+    regions_for_bounds,
+)
+from app.models.company import Company, CompanyTombstone, row_version_seq
 from app.schemas.company import (
     CompanyCreate,
+    CompanyFieldsListResponse,
+    CompanyFieldsResponse,
     CompanyResponse,
     CompanyListResponse,
+    CompanySyncResponse,
+    CompanyWithinRequest,
+    CompanyWithinResponse,
 )
 
-router = APIRouter(prefix="/api/companies", tags=["companies"])
+# "off", "ignore" (return the existing company) or "update" (refresh it)
+COMPANY_DEDUP_MODE = os.getenv("COMPANY_DEDUP_MODE", "off")
 
+# Fields a list request may restrict itself to with ?fields=
+SPARSE_FIELDS = ("id", "name", "industry", "location", "latitude", "longitude")
 
-@router.get("/", response_model=CompanyListResponse)
+# Regions with more vertices are rejected; above the simplify threshold they
+# are simplified with this tolerance (in degrees) before querying
+WITHIN_MAX_VERTICES = int(os.getenv("WITHIN_MAX_VERTICES", "10000"))
+WITHIN_SIMPLIFY_VERTICES = int(os.getenv("WITHIN_SIMPLIFY_VERTICES", "1000"))
+WITHIN_SIMPLIFY_TOLERANCE = float(os.getenv("WITHIN_SIMPLIFY_TOLERANCE", "0.0005"))
+WITHIN_STREAM_CHUNK_SIZE = 1000
+
+router = APIRouter(
+    prefix="/api/companies", tags=["companies"], route_class=InstrumentedRoute
+)
+
+
+@router.get(
+    "/", response_model=Union[CompanyListResponse, CompanyFieldsListResponse]
+)
 async def get_companies(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, e.g. id,latitude,longitude",
+    ),
     *,
     db: Session = Depends(get_db),
 ):
     """
     Retrieve a list of companies with pagination.
 
+    With ``fields`` only the requested columns are selected and returned,
+    e.g. ``fields=id,latitude,longitude`` for map markers. Identical
+    concurrent requests are coalesced when single-flight is enabled.
+
     Args:
+        request: Incoming request, identifying identical reads
         skip: Number of records to skip for pagination
         limit: Maximum number of records to return
+        fields: Optional comma-separated subset of company fields
         db: Database session
 
     Returns:
         List of companies with total count
     """
+    columns = _parse_fields(fields) if fields else None
+
+    def load(session):
+        total = session.scalar(select(func.count()).select_from(Company))
+        if columns is not None:
+            rows = session.execute(
+                select(*columns).offset(skip).limit(limit)
+            ).mappings()
+            return _render_fields(
+                CompanyFieldsListResponse(
+                    companies=[dict(row) for row in rows], total=total
+                )
+            )
+        companies = session.query(Company).offset(skip).limit(limit).all()
+        return _render_model(CompanyListResponse(companies=companies, total=total))
+
+    return await _coalesced_response(request, db, load)
 
-    companies = db.query(Company).offset(skip).limit(limit).all()
-    total = db.query(Company).count()
 
-    return CompanyListResponse(companies=companies, total=total)
+def _parse_fields(fields: str):
+    """
+    Map a comma-separated field list onto company columns.
+
+    Raises:
+        HTTPException: If a field is not part of the company response
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    names = list(dict.fromkeys(names))
+    unknown = [name for name in names if name not in SPARSE_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f"Unknown fields: {', '.join(unknown) or '(none given)'}; "
+                f"choose from {', '.join(SPARSE_FIELDS)}"
+            ),
+        )
+    return [Company.__table__.c[name] for name in names]
+
+
+def _render_model(model):
+    """Serialise a response model to JSON bytes."""
+    return model.model_dump_json().encode("utf-8")
+
+
+def _render_fields(model):
+    """Serialise a response of trimmed companies, leaving out unselected fields."""
+    return model.model_dump_json(exclude_unset=True).encode("utf-8")
+
+
+async def _coalesced_response(
+    request: Request, db: Session, load, body_key=None, headers=None
+):
+    """
+    Run ``load`` through single-flight and wrap its body in a response.
+
+    The shared work can outlive the request that started it, whose session
+    is closed when that request ends or is cancelled, so ``load`` gets a
+    session of its own on the same bind.
+
+    Args:
+        request: Incoming request; its path and query form the key
+        db: Request's database session, whose bind the work uses
+        load: Callable taking a session and returning the serialised JSON body
+        body_key: Extra key material for requests whose body matters
+        headers: Headers to add to the response
+    """
+    query = tuple(sorted(request.query_params.multi_items()))
+    key = (request.url.path, query, body_key)
+    bind = db.get_bind()
+
+    def work():
+        with Session(bind=bind, autoflush=False) as session:
+            return load(session)
+
+    body, outcome = await single_flight.run(key, work)
+    headers = dict(headers or {})
+    if outcome is not None:
+        headers["Single-Flight"] = outcome
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post(
@@ -47,34 +200,455 @@ async def get_companies(
 )
 async def create_company(
     company: CompanyCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     *,
     db: Session = Depends(get_db),
 ):
     """
     Create a new company record.
 
+    Retries that send the same ``Idempotency-Key`` header get the original
+    response back. In dedup mode an existing company with the same
+    normalised name and snapped coordinates is returned (and in ``update``
+    mode refreshed) with 200 instead of creating another. Otherwise, with
+    write-behind enabled, creates without an ``Idempotency-Key`` are queued
+    and group-committed in a batch; in ``enqueue`` durability mode the
+    response is 202 Accepted.
+
     Args:
         company: Company data to create
+        response: Outgoing response, for the status code
+        idempotency_key: Optional client key identifying retries of one create
         db: Database session
 
     Returns:
         Created company data
     """
+    payload_hash = None
+    if idempotency_key:
+        payload_hash = request_hash(company.model_dump())
+        stored = get_stored_response(db, idempotency_key)
+        if stored is not None:
+            return _replay_stored_response(stored, payload_hash)
+
+    if COMPANY_DEDUP_MODE != "off":
+        created, result = _upsert_company(db, company)
+        status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    elif WRITE_BEHIND_ENABLED and not idempotency_key:
+        # Keyed creates stay on this transaction so the company and its
+        # idempotency record commit together
+        status_code, result = await _create_company_write_behind(company)
+    else:
+        status_code = status.HTTP_201_CREATED
+        result = _insert_company(db, company)
+
+    if idempotency_key:
+        add_stored_response(
+            db,
+            idempotency_key,
+            payload_hash,
+            status_code,
+            result.model_dump(mode="json"),
+        )
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key committed first
+        db.rollback()
+        stored = get_stored_response(db, idempotency_key) if idempotency_key else None
+        if stored is None:
+            raise
+        return _replay_stored_response(stored, payload_hash)
+
+    single_flight.invalidate()
+    response.status_code = status_code
+    return result
+
+
+def _replay_stored_response(stored, payload_hash):
+    """
+    Return the response recorded for an idempotency key.
+    """
+    if stored.request_hash != payload_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key has already been used for a different request",
+        )
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=stored.response_body,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _company_values(company: CompanyCreate):
+    """
+    Column values for inserting a company, including its derived columns.
+    """
+    values = company.model_dump()
+    values["geom"] = f"SRID=4326;POINT({company.longitude} {company.latitude})"
+    values["dedup_key"] = make_dedup_key(
+        company.name, company.latitude, company.longitude
+    )
+    values["region"] = company_region(company.latitude, company.longitude)
+    return values
+
+
+def _insert_company(db: Session, company: CompanyCreate):
+    """
+    Insert a company, even if it duplicates an existing one.
+
+    The dedup key is kept by the first company to claim it; a duplicate is
+    stored without one, as the dedup migration did for existing duplicates,
+    so turning dedup mode on later still matches against the first.
+
+    Returns:
+        Created company data
+    """
+    table = Company.__table__
+    values = _company_values(company)
+    statement = (
+        pg_insert(table)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[table.c.dedup_key, table.c.region])
+        .returning(*table.c)
+    )
+    row = db.execute(statement).mappings().first()
+    if row is None:
+        values["dedup_key"] = None
+        statement = insert(table).values(**values).returning(*table.c)
+        row = db.execute(statement).mappings().one()
+    return CompanyResponse.model_validate(dict(row))
+
+
+def _upsert_company(db: Session, company: CompanyCreate):
+    """
+    Insert a company unless its dedup key exists, in a single statement.
+
+    Returns:
+        Tuple of (whether a new row was inserted, company data)
+    """
+    table = Company.__table__
+    values = _company_values(company)
+
+    statement = pg_insert(table).values(**values)
+    if COMPANY_DEDUP_MODE == "update":
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.dedup_key, table.c.region],
+            set_={
+                "name": statement.excluded.name,
+                "industry": statement.excluded.industry,
+                "location": statement.excluded.location,
+                "latitude": statement.excluded.latitude,
+                "longitude": statement.excluded.longitude,
+                "geom": statement.excluded.geom,
+                "row_version": row_version_seq.next_value(),
+                "row_xid": func.pg_current_xact_id(),
+            },
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=[table.c.dedup_key, table.c.region]
+        )
+    # xmax is zero only for freshly inserted tuples
+    statement = statement.returning(
+        *table.c, literal_column("xmax = 0").label("inserted")
+    )
+
+    row = db.execute(statement).mappings().first()
+    if row is None:
+        # Both key columns, so a partitioned table only probes one partition
+        existing = (
+            db.query(Company)
+            .filter(
+                Company.dedup_key == values["dedup_key"],
+                Company.region == values["region"],
+            )
+            .one()
+        )
+        return False, CompanyResponse.model_validate(existing)
+    return row["inserted"], CompanyResponse.model_validate(dict(row))
+
+
+async def _create_company_write_behind(company: CompanyCreate):
+    """
+    Queue a create on the write-behind queue.
 
-    # Create PostGIS point from coordinates
-    db_company = Company(
-        name=company.name,
-        industry=company.industry,
-        location=company.location,
-        latitude=company.latitude,
-        longitude=company.longitude,
+    Returns:
+        Tuple of (status code, company data)
+    """
+    try:
+        row = await write_behind_queue.submit(_company_values(company))
+    except (QueueFullError, QueueClosedError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create company: {str(e)}",
+        )
+
+    if write_behind_queue.acknowledges_on_enqueue:
+        return status.HTTP_202_ACCEPTED, CompanyResponse(**row)
+    return status.HTTP_201_CREATED, CompanyResponse(**row)
+
+
+@router.get("/sync", response_model=CompanySyncResponse)
+async def sync_companies(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    *,
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the companies created, updated or deleted after a given version.
+
+    Clients start with ``since=0`` and keep passing the returned ``version``
+    back until ``has_more`` is false. Changes that an earlier, still running
+    transaction could precede are held back until it finishes, so a batch
+    may stop short and the next call picks them up.
+
+    Args:
+        since: Last version the client has already applied
+        limit: Maximum number of changes to return in this batch
+        db: Database session
+
+    Returns:
+        Batch of changed companies and deleted company IDs
+    """
+    # Versions are drawn before they commit, so one written by a transaction
+    # that is still running may end up below versions already visible. Only
+    # rows written before the oldest running transaction began are final;
+    # a batch stops at the first row that is not, and the client picks it up
+    # on a later call once everything below it has committed.
+    horizon = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    # The horizon counts this transaction too, whose own writes it can see
+    own_xid = func.pg_current_xact_id_if_assigned()
+
+    # One statement, so both streams and the horizon come from the same
+    # snapshot; separate queries could miss a change committed between them
+    changes = (
+        union_all(
+            select(
+                Company.row_version,
+                Company.id.label("company_id"),
+                false().label("deleted"),
+                or_(Company.row_xid < horizon, Company.row_xid == own_xid).label(
+                    "settled"
+                ),
+            ).where(Company.row_version > since),
+            select(
+                CompanyTombstone.row_version,
+                CompanyTombstone.company_id,
+                true().label("deleted"),
+                or_(CompanyTombstone.row_xid < horizon, CompanyTombstone.row_xid == own_xid).label(
+                    "settled"
+                ),
+            ).where(CompanyTombstone.row_version > since),
+        )
+        .order_by("row_version")
+        .limit(limit + 1)
+        .subquery()
     )
+    rows = db.execute(
+        select(
+            changes.c.row_version,
+            changes.c.company_id,
+            changes.c.deleted,
+            changes.c.settled,
+            Company,
+        )
+        .outerjoin(
+            Company, and_(~changes.c.deleted, Company.id == changes.c.company_id)
+        )
+        .order_by(changes.c.row_version)
+    ).all()
 
-    db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for position, row in enumerate(rows):
+        if not row.settled:
+            rows = rows[:position]
+            has_more = False
+            break
 
-    return db_company
+    return CompanySyncResponse(
+        changes=[row.Company for row in rows if not row.deleted],
+        deleted=[row.company_id for row in rows if row.deleted],
+        version=rows[-1].row_version if rows else since,
+        has_more=has_more,
+    )
+
+
+@router.post("/within", response_model=CompanyWithinResponse)
+async def get_companies_within(
+    search: CompanyWithinRequest,
+    request: Request,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return; id is always included",
+    ),
+    stream: bool = Query(
+        False, description="Stream every match as NDJSON instead of one page"
+    ),
+    *,
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the companies inside a GeoJSON Polygon or MultiPolygon.
+
+    Matches are found with ``ST_Intersects`` on the indexed geography column,
+    so polygon edges follow great circles. Pages are ordered by ID; pass the
+    returned ``next_after_id`` back as ``after_id`` for the next one. Regions
+    with more than ``WITHIN_SIMPLIFY_VERTICES`` vertices are simplified first
+    and the response carries a ``Region-Simplified`` header.
+
+    Args:
+        search: Region to search and optional industry filter
+        request: Incoming request, identifying identical reads
+        after_id: Only return companies with a greater ID
+        limit: Maximum number of companies in a page
+        fields: Optional comma-separated subset of company fields
+        stream: Stream all matches as newline-delimited JSON
+        db: Database session
+
+    Returns:
+        Page of companies inside the region
+    """
+    vertices = search.geometry.vertex_count()
+    if vertices > WITHIN_MAX_VERTICES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f"Region has {vertices} vertices; "
+                f"the limit is {WITHIN_MAX_VERTICES}"
+            ),
+        )
+
+    columns = _parse_fields(fields) if fields else [
+        Company.__table__.c[name] for name in SPARSE_FIELDS
+    ]
+    if Company.__table__.c.id not in columns:
+        columns.insert(0, Company.__table__.c.id)
+
+    simplified = vertices > WITHIN_SIMPLIFY_VERTICES
+    area = func.ST_SetSRID(
+        func.ST_GeomFromGeoJSON(search.geometry.model_dump_json()), 4326
+    )
+    if simplified:
+        area = func.ST_SimplifyPreserveTopology(area, WITHIN_SIMPLIFY_TOLERANCE)
+
+    statement = (
+        select(*columns)
+        .where(func.ST_Intersects(Company.geom, cast(area, Geography(srid=4326))))
+        # Redundant with the intersection, but lets a partitioned table skip
+        # partitions far from the area
+        .where(Company.region.in_(_candidate_regions(search.geometry, simplified)))
+        .where(Company.id > after_id)
+        .order_by(Company.id)
+    )
+    if search.industry:
+        statement = statement.where(Company.industry == search.industry)
+
+    headers = {"Region-Simplified": "true"} if simplified else {}
+    if stream:
+        return StreamingResponse(
+            _stream_rows(db.get_bind(), statement),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+
+    def load(session):
+        rows = session.execute(statement.limit(limit + 1)).mappings().all()
+        next_after_id = rows[limit - 1]["id"] if len(rows) > limit else None
+        return _render_fields(
+            CompanyWithinResponse(
+                companies=[dict(row) for row in rows[:limit]],
+                next_after_id=next_after_id,
+            )
+        )
+
+    return await _coalesced_response(
+        request, db, load, body_key=search.model_dump_json(), headers=headers
+    )
+
+
+def _candidate_regions(geometry, simplified):
+    """
+    Return the company regions a search area can overlap.
+
+    Holes lie inside their polygon's exterior ring, so only exterior rings
+    are bounded.
+    """
+    polygons = geometry.coordinates
+    if geometry.type == "Polygon":
+        polygons = [polygons]
+    regions = set()
+    for polygon in polygons:
+        west, south, east, north = geodesic_bounds(polygon[0])
+        if simplified and east - west >= 360:
+            return regions_for_bounds(-180, -90, 180, 90)
+        if simplified:
+            # Simplified edges join vertices further apart and can bow
+            # further poleward, so bound them with the box's own edges,
+            # split so none spans more than half the globe
+            middle = west + ((east - west) % 360) / 2
+            box = [
+                [west, south],
+                [middle, south],
+                [east, south],
+                [east, north],
+                [middle, north],
+                [west, north],
+                [west, south],
+            ]
+            west, south, east, north = geodesic_bounds(box)
+        regions.update(regions_for_bounds(west, south, east, north))
+    return sorted(regions)
+
+
+def _stream_rows(bind, statement):
+    """
+    Yield query results as NDJSON from a server-side cursor, each row
+    serialised like the companies of a page.
+
+    The request's session is closed before a streamed body is sent, so this
+    opens a connection of its own from the session's engine. A session
+    bound to a connection, as in the integration tests, streams on that
+    connection, whose owner closes it.
+    """
+    with _stream_connection(bind) as connection:
+        result = connection.execute(
+            statement,
+            execution_options={
+                "stream_results": True,
+                "yield_per": WITHIN_STREAM_CHUNK_SIZE,
+            },
+        )
+        for rows in result.mappings().partitions():
+            yield "".join(
+                CompanyFieldsResponse.model_validate(dict(row)).model_dump_json(
+                    exclude_unset=True
+                )
+                + "\n"
+                for row in rows
+            )
+
+
+@contextmanager
+def _stream_connection(bind):
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.connect() as connection:
+            yield connection
 
 
 @router.get("/{company_id}", response_model=CompanyResponse)
@@ -117,6 +691,7 @@ async def delete_company(company_id: int, db: Session = Depends(get_db)):
 
     try:
         db.delete(company)
+        db.add(CompanyTombstone(company_id=company.id))
         db.commit()
     except Exception as e:
         db.rollback()
@@ -124,3 +699,5 @@ async def delete_company(company_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete company: {str(e)}",
         )
+
+    single_flight.invalidate()
@@ -0,0 +1,32 @@
+"""
+Pydantic schemas for admin and diagnostics endpoints.
+"""
+
+from datetime import datetime
+from typing import Any, Optional
+from pydantic import BaseModel, Field
+
+
+class SlowQueryResponse(BaseModel):
+    """Schema for an aggregated slow statement."""
+
+    statement: str
+    count: int
+    total_ms: float
+    max_ms: float
+    mean_ms: float
+    last_parameters: Optional[str] = None
+    last_seen: Optional[datetime] = None
+    plan: Optional[Any] = Field(
+        None,
+        description="Most recent EXPLAIN (ANALYZE, BUFFERS) output, if sampled",
+    )
+    plan_ms: Optional[float] = Field(
+        None,
+        description="Duration of the execution the plan was captured for",
+    )
+
+    class Config:
+        """Pydantic configuration."""
+
+        from_attributes = True
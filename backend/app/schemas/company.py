@@ -2,8 +2,8 @@
 Pydantic schemas for company data validation and serialization.
 """
 
-from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class CompanyBase(BaseModel):
@@ -95,3 +95,123 @@ class CompanyListResponse(BaseModel):
 
     companies: list[CompanyResponse]
     total: int
+
+
+class CompanyFieldsResponse(BaseModel):
+    """Schema for a company trimmed to the fields a request asked for."""
+
+    id: Optional[int] = None
+    name: Optional[str] = None
+    industry: Optional[str] = None
+    location: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    class Config:
+        """Pydantic configuration."""
+
+        json_encoders = {
+            float: lambda v: round(v, 6)  # Round as CompanyResponse does
+        }
+
+
+class CompanyFieldsListResponse(BaseModel):
+    """Schema for a list of companies trimmed with ``fields``."""
+
+    companies: list[CompanyFieldsResponse]
+    total: int
+
+
+class CompanySyncItem(CompanyResponse):
+    """Schema for a created or updated company in a sync batch."""
+
+    row_version: int
+
+
+class CompanySyncResponse(BaseModel):
+    """Schema for an incremental sync batch."""
+
+    changes: list[CompanySyncItem]
+    deleted: list[int] = Field(
+        default_factory=list,
+        description="IDs of companies deleted since the requested version",
+    )
+    version: int = Field(
+        ...,
+        description="Highest version included; pass as `since` for the next batch",
+    )
+    has_more: bool = Field(
+        ...,
+        description="Whether further changes are pending after this batch",
+    )
+
+
+class GeoJSONPolygon(BaseModel):
+    """Schema for a GeoJSON Polygon or MultiPolygon geometry."""
+
+    type: Literal["Polygon", "MultiPolygon"]
+    coordinates: list = Field(
+        ...,
+        description="Rings of [longitude, latitude] positions, as in GeoJSON",
+    )
+
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        """Validate ring structure and coordinate ranges."""
+        polygons = (
+            [self.coordinates] if self.type == "Polygon" else self.coordinates
+        )
+        if not polygons:
+            raise ValueError("MultiPolygon must contain at least one polygon")
+        for polygon in polygons:
+            if not isinstance(polygon, list) or not polygon:
+                raise ValueError("Polygon must contain at least one ring")
+            for ring in polygon:
+                _validate_ring(ring)
+        return self
+
+    def vertex_count(self):
+        """Total number of positions across all rings."""
+        polygons = (
+            [self.coordinates] if self.type == "Polygon" else self.coordinates
+        )
+        return sum(len(ring) for polygon in polygons for ring in polygon)
+
+
+def _validate_ring(ring):
+    if not isinstance(ring, list) or len(ring) < 4:
+        raise ValueError("Polygon rings must have at least four positions")
+    for position in ring:
+        if (
+            not isinstance(position, list)
+            or len(position) < 2
+            or not all(isinstance(value, (int, float)) for value in position[:2])
+        ):
+            raise ValueError("Positions must be [longitude, latitude] numbers")
+        longitude, latitude = position[:2]
+        if not -180 <= longitude <= 180 or not -90 <= latitude <= 90:
+            raise ValueError("Positions must be valid longitude/latitude degrees")
+    if ring[0][:2] != ring[-1][:2]:
+        raise ValueError("Polygon rings must be closed")
+
+
+class CompanyWithinRequest(BaseModel):
+    """Schema for a search for companies inside a region."""
+
+    geometry: GeoJSONPolygon
+    industry: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=255,
+        description="Only return companies in this industry",
+    )
+
+
+class CompanyWithinResponse(BaseModel):
+    """Schema for a page of companies inside a region."""
+
+    companies: list[CompanyFieldsResponse]
+    next_after_id: Optional[int] = Field(
+        None,
+        description="Pass as `after_id` for the next page; null on the last page",
+    )
@@ -0,0 +1,124 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When ``SINGLE_FLIGHT_ENABLED`` is set, read endpoints pass their database
+work to ``single_flight.run`` under a key built from the request. The first
+request for a key runs the work in a thread; identical requests arriving
+while it runs wait for the same result instead of querying again. The
+serialised body is then kept for ``SINGLE_FLIGHT_CACHE_MS`` so a burst that
+straddles the end of the query is served from memory too.
+
+Coalescing is per process. Writes in this process call ``invalidate`` so
+later reads do not see a result from before the write; other workers can
+serve such a result for at most the cache window.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+
+from app.metrics import single_flight_requests
+
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SINGLE_FLIGHT_CACHE_MS = float(os.getenv("SINGLE_FLIGHT_CACHE_MS", "250"))
+SINGLE_FLIGHT_MAX_ENTRIES = int(os.getenv("SINGLE_FLIGHT_MAX_ENTRIES", "1024"))
+
+
+class SingleFlight:
+    """
+    Shares in-flight and just-finished results between identical requests.
+    """
+
+    def __init__(
+        self,
+        enabled=SINGLE_FLIGHT_ENABLED,
+        cache_ms=SINGLE_FLIGHT_CACHE_MS,
+        max_entries=SINGLE_FLIGHT_MAX_ENTRIES,
+    ):
+        self.enabled = enabled
+        self.cache_ttl = cache_ms / 1000
+        self.max_entries = max_entries
+        self._inflight = {}
+        self._cache = OrderedDict()
+        self._generation = 0
+
+    async def run(self, key, work):
+        """
+        Return the result of ``work``, sharing it with identical requests.
+
+        Args:
+            key: Hashable identity of the request, e.g. path, query and body
+            work: Callable doing the blocking database work and returning the
+                serialised response body
+
+        Returns:
+            Tuple of (result, outcome), where outcome is "leader", "shared",
+            "cached" or None when coalescing is disabled
+        """
+        if not self.enabled:
+            return work(), None
+
+        loop = asyncio.get_running_loop()
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if expires_at > loop.time():
+                single_flight_requests.inc("cached")
+                return result, "cached"
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            outcome = "shared"
+        else:
+            outcome = "leader"
+            # A task of its own, so a leader that disconnects does not cancel
+            # the work the others are waiting for
+            task = asyncio.ensure_future(asyncio.to_thread(work))
+            self._inflight[key] = task
+            task.add_done_callback(
+                lambda done, generation=self._generation: self._finish(
+                    key, done, generation
+                )
+            )
+
+        single_flight_requests.inc(outcome)
+        return await asyncio.shield(task), outcome
+
+    def _finish(self, key, task, generation):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Failures are not cached, and neither are results a write overtook
+        if (
+            task.cancelled()
+            or task.exception() is not None
+            or generation != self._generation
+            or self.cache_ttl <= 0
+        ):
+            return
+        self._cache[key] = (
+            asyncio.get_running_loop().time() + self.cache_ttl,
+            task.result(),
+        )
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Forget cached results and detach in-flight ones after a write.
+
+        Requests already waiting still get their result; new requests start
+        a fresh query.
+        """
+        self._generation += 1
+        self._cache.clear()
+        self._inflight.clear()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,175 @@
+"""
+Slow-query log with sampled EXPLAIN capture.
+
+Enabled by setting ``SLOW_QUERY_THRESHOLD_MS``. Statements that take longer
+are logged with their parameters and aggregated in memory; a sample of slow
+SELECTs is re-run under ``EXPLAIN (ANALYZE, BUFFERS)`` so the plan is kept
+alongside the timing.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+from datetime import datetime, timezone
+
+from app.query_timing import on_statement
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0"))
+
+# EXPLAIN ANALYZE executes the statement a second time, so keep this low
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+SLOW_QUERY_MAX_ENTRIES = int(os.getenv("SLOW_QUERY_MAX_ENTRIES", "100"))
+
+_MAX_PARAMETERS_LENGTH = 1000
+_READ_ONLY_STATEMENT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_SIDE_EFFECT_FUNCTIONS = re.compile(r"\b(nextval|setval)\s*\(", re.IGNORECASE)
+
+
+class SlowQueryEntry:
+    """
+    Aggregated timings for one slow statement.
+    """
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_parameters = None
+        self.last_seen = None
+        self.plan = None
+        self.plan_ms = None
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def record(self, elapsed_ms, parameters):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_parameters = parameters
+        self.last_seen = datetime.now(timezone.utc)
+
+
+class SlowQueryLog:
+    """
+    Bounded in-memory store of the worst statements seen by this process.
+    """
+
+    def __init__(self, max_entries=SLOW_QUERY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, elapsed_ms, parameters, plan=None):
+        key = " ".join(statement.split())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._evict()
+                entry = self._entries[key] = SlowQueryEntry(key)
+            entry.record(elapsed_ms, parameters)
+            if plan is not None:
+                entry.plan = plan
+                entry.plan_ms = elapsed_ms
+
+    def _evict(self):
+        # Drop the mildest offender to make room
+        mildest = min(self._entries.values(), key=lambda entry: entry.max_ms)
+        del self._entries[mildest.statement]
+
+    def worst(self, limit=20, order_by="total_ms"):
+        with self._lock:
+            entries = list(self._entries.values())
+        entries.sort(key=lambda entry: getattr(entry, order_by), reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _format_parameters(parameters):
+    text = repr(parameters)
+    if len(text) > _MAX_PARAMETERS_LENGTH:
+        text = text[:_MAX_PARAMETERS_LENGTH] + "..."
+    return text
+
+
+def _explain(cursor, statement, parameters):
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS) for a statement on the same connection.
+
+    A savepoint keeps a failing EXPLAIN from aborting the caller's transaction.
+    """
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+            )
+            plan = explain_cursor.fetchone()[0]
+        except Exception:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        finally:
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        explain_cursor.close()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan
+
+
+def _record_statement(conn, cursor, statement, parameters, executemany, elapsed):
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    formatted_parameters = _format_parameters(parameters)
+    logger.warning(
+        "Slow query (%.1f ms): %s; parameters: %s",
+        elapsed_ms,
+        statement,
+        formatted_parameters,
+    )
+
+    plan = None
+    if (
+        conn.dialect.name == "postgresql"
+        and not executemany
+        and _READ_ONLY_STATEMENT.match(statement)
+        and not _SIDE_EFFECT_FUNCTIONS.search(statement)
+        and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        try:
+            plan = _explain(cursor, statement, parameters)
+        except Exception:
+            logger.exception("Failed to EXPLAIN slow query")
+        else:
+            logger.warning("Plan for slow query: %s", json.dumps(plan))
+
+    slow_query_log.record(statement, elapsed_ms, formatted_parameters, plan)
+
+
+def instrument_engine(engine):
+    """
+    Attach slow-query logging hooks to an engine.
+
+    Args:
+        engine: SQLAlchemy engine to instrument
+    """
+    on_statement(engine, _record_statement)
@@ -0,0 +1,333 @@
+"""
+Write-behind queue for company creates.
+
+When ``WRITE_BEHIND_ENABLED`` is set, validated creates get an ID from a
+block reserved up front from the ``companies`` id sequence and are queued; a
+background task group-commits the queue in batches of up to
+``WRITE_BEHIND_BATCH_SIZE`` rows or every ``WRITE_BEHIND_FLUSH_INTERVAL_MS``.
+
+``WRITE_BEHIND_DURABILITY`` controls when a create is acknowledged:
+
+- ``commit``: after its batch has committed (group commit)
+- ``async_commit``: as ``commit``, but the batch commits with
+  ``synchronous_commit = off``, so a database crash can lose the last moments
+  of acknowledged writes
+- ``enqueue``: as soon as it is queued; a process crash loses queued writes
+
+Transient database errors are retried up to ``WRITE_BEHIND_RETRIES`` times
+with exponential backoff. A batch that still fails is written row by row,
+so one bad row only fails its own create; in ``enqueue`` mode such a row has
+already been acknowledged and is logged as dropped.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.database import engine
+from app.models.company import Company
+from app.singleflight import single_flight
+
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "5"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_ENQUEUE_TIMEOUT_MS = float(
+    os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT_MS", "1000")
+)
+WRITE_BEHIND_ID_BLOCK_SIZE = int(os.getenv("WRITE_BEHIND_ID_BLOCK_SIZE", "1000"))
+WRITE_BEHIND_DURABILITY = os.getenv("WRITE_BEHIND_DURABILITY", "commit")
+WRITE_BEHIND_RETRIES = int(os.getenv("WRITE_BEHIND_RETRIES", "3"))
+WRITE_BEHIND_RETRY_BACKOFF_MS = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF_MS", "50"))
+
+DURABILITY_MODES = ("commit", "async_commit", "enqueue")
+
+
+class QueueFullError(Exception):
+    """Raised when the write-behind queue cannot accept more writes in time."""
+
+
+class QueueClosedError(Exception):
+    """Raised when writes are submitted after shutdown has begun."""
+
+
+def is_transient_error(exc):
+    """
+    Whether a failed write may succeed if retried unchanged.
+
+    Lost connections, deadlocks, serialisation failures and lock timeouts
+    surface as OperationalError; constraint and data errors do not.
+    """
+    if isinstance(exc, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+def reserve_ids(count):
+    """
+    Reserve a block of company IDs from the id sequence.
+
+    Args:
+        count: Number of IDs to reserve
+
+    Returns:
+        List of reserved IDs
+    """
+    with engine.begin() as connection:
+        result = connection.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('companies', 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": count},
+        )
+        return [row[0] for row in result]
+
+
+def insert_rows(rows, synchronous_commit=True):
+    """
+    Insert a batch of company rows in a single transaction.
+
+    Rows whose dedup key is already taken are inserted without it, like
+    other creates made outside dedup mode. Rows whose reserved ID already
+    exists are skipped, so retrying a batch whose commit did succeed, even
+    though the connection was lost before it was confirmed, writes nothing
+    twice.
+
+    Args:
+        rows: List of column dictionaries, including ``id``
+        synchronous_commit: Whether the commit waits for the WAL flush
+    """
+    table = Company.__table__
+    with engine.begin() as connection:
+        if not synchronous_commit:
+            connection.execute(text("SET LOCAL synchronous_commit = off"))
+        written = set(
+            connection.execute(
+                select(table.c.id).where(table.c.id.in_([row["id"] for row in rows]))
+            ).scalars()
+        )
+        rows = [row for row in rows if row["id"] not in written]
+        if not rows:
+            return
+        inserted = set(
+            connection.execute(
+                pg_insert(table)
+                .on_conflict_do_nothing(
+                    index_elements=[table.c.dedup_key, table.c.region]
+                )
+                .returning(table.c.id),
+                rows,
+            ).scalars()
+        )
+        duplicates = [
+            {**row, "dedup_key": None} for row in rows if row["id"] not in inserted
+        ]
+        if duplicates:
+            connection.execute(insert(table), duplicates)
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending creates with a background batch writer.
+    """
+
+    def __init__(
+        self,
+        batch_size=WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms=WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        max_pending=WRITE_BEHIND_MAX_PENDING,
+        enqueue_timeout_ms=WRITE_BEHIND_ENQUEUE_TIMEOUT_MS,
+        id_block_size=WRITE_BEHIND_ID_BLOCK_SIZE,
+        durability=WRITE_BEHIND_DURABILITY,
+        retries=WRITE_BEHIND_RETRIES,
+        retry_backoff_ms=WRITE_BEHIND_RETRY_BACKOFF_MS,
+        id_reserver=reserve_ids,
+        writer=insert_rows,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown write-behind durability: {durability}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.id_block_size = id_block_size
+        self.durability = durability
+        self.retries = retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self._id_reserver = id_reserver
+        self._writer = writer
+        self._ids = deque()
+        self._id_lock = None
+        self._queue = None
+        self._task = None
+        self._closing = False
+
+    @property
+    def acknowledges_on_enqueue(self):
+        return self.durability == "enqueue"
+
+    async def start(self):
+        """Start the background writer on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._id_lock = asyncio.Lock()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting writes and flush everything still queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _next_id(self):
+        async with self._id_lock:
+            if not self._ids:
+                self._ids.extend(
+                    await asyncio.to_thread(self._id_reserver, self.id_block_size)
+                )
+            return self._ids.popleft()
+
+    async def submit(self, values):
+        """
+        Queue a create and return its row, including the reserved ID.
+
+        Depending on the durability mode this waits for the batch commit.
+
+        Args:
+            values: Column values for the new company, without ``id``
+
+        Returns:
+            Column dictionary of the created company
+
+        Raises:
+            QueueFullError: If the queue stays full past the enqueue timeout
+            QueueClosedError: If the queue is shutting down
+        """
+        if self._task is None or self._closing:
+            raise QueueClosedError("Write-behind queue is not accepting writes")
+
+        row = {"id": await self._next_id(), **values}
+        future = None if self.acknowledges_on_enqueue else asyncio.Future()
+        try:
+            await asyncio.wait_for(
+                self._queue.put((row, future)), timeout=self.enqueue_timeout
+            )
+        except asyncio.TimeoutError:
+            raise QueueFullError("Write-behind queue is full")
+
+        if future is not None:
+            await future
+        return row
+
+    async def _collect_batch(self):
+        """Wait for one write, then gather more until the batch fills or times out."""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch):
+        """Write a batch, falling back to one row at a time if it fails."""
+        try:
+            await self._write([row for row, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                self._fail(batch[0], exc)
+                return
+            logger.exception(
+                "Write-behind batch of %d rows failed; writing rows one by one",
+                len(batch),
+            )
+            for row, future in batch:
+                try:
+                    await self._write([row])
+                except Exception as row_exc:
+                    self._fail((row, future), row_exc)
+                else:
+                    single_flight.invalidate()
+                    _resolve(future)
+        else:
+            # The create already invalidated when it was queued, but in
+            # enqueue mode a read may have cached the list since then
+            single_flight.invalidate()
+            for _, future in batch:
+                _resolve(future)
+
+    async def _write(self, rows):
+        """Run the writer, retrying transient errors with exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                await asyncio.to_thread(
+                    self._writer, rows, self.durability != "async_commit"
+                )
+                return
+            except Exception as exc:
+                if attempt == self.retries or not is_transient_error(exc):
+                    raise
+                logger.warning(
+                    "Write-behind write of %d rows failed (attempt %d); retrying: %s",
+                    len(rows),
+                    attempt + 1,
+                    exc,
+                )
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+
+    @staticmethod
+    def _fail(item, exc):
+        row, future = item
+        if future is None:
+            logger.error(
+                "Dropped acknowledged write-behind row %s", row.get("id"), exc_info=exc
+            )
+        elif not future.done():
+            future.set_exception(exc)
+
+
+def _resolve(future):
+    if future is not None and not future.done():
+        future.set_result(None)
+
+
+write_behind_queue = WriteBehindQueue()
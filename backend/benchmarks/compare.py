@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files produced by ``benchmarks.run``.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+
+
+METRICS = [
+    ("throughput_rps", lambda summary: summary["throughput_rps"]),
+    ("p50_ms", lambda summary: summary["latency_ms"]["p50"]),
+    ("p95_ms", lambda summary: summary["latency_ms"]["p95"]),
+    ("p99_ms", lambda summary: summary["latency_ms"]["p99"]),
+]
+
+
+def _change(before, after):
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(baseline, candidate):
+    """
+    Build a table of per-endpoint changes between two runs.
+
+    Returns:
+        List of (endpoint, metric, before, after, change) rows
+    """
+    rows = []
+    for endpoint, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(endpoint)
+        if after is None:
+            continue
+        for name, extract in METRICS:
+            rows.append(
+                (
+                    endpoint,
+                    name,
+                    extract(before),
+                    extract(after),
+                    _change(extract(before), extract(after)),
+                )
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {baseline.get('commit')}")
+    print(f"candidate: {candidate.get('commit')}")
+    print(f"{'endpoint':<10}{'metric':<16}{'before':>12}{'after':>12}{'change':>10}")
+    for endpoint, name, before, after, change in compare(baseline, candidate):
+        print(f"{endpoint:<10}{name:<16}{before:>12}{after:>12}{change:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Synthetic company data generator with realistic spatial clustering.
+
+Most companies are scattered around major business hubs, weighted by hub
+size, with a thin layer of uniformly distributed noise on top.
+
+Usage:
+    python -m benchmarks.datagen --count 100000 --seed 42 [--truncate]
+"""
+
+import argparse
+import logging
+import math
+import random
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.database import DATABASE_URL
+from app.dataload import load_companies, log_progress
+
+
+# (city, country, latitude, longitude, relative weight)
+HUBS = [
+    ("New York", "USA", 40.7128, -74.0060, 10),
+    ("San Francisco", "USA", 37.7749, -122.4194, 8),
+    ("Chicago", "USA", 41.8781, -87.6298, 5),
+    ("Toronto", "Canada", 43.6532, -79.3832, 4),
+    ("Mexico City", "Mexico", 19.4326, -99.1332, 4),
+    ("Sao Paulo", "Brazil", -23.5505, -46.6333, 5),
+    ("London", "UK", 51.5074, -0.1278, 9),
+    ("Paris", "France", 48.8566, 2.3522, 6),
+    ("Berlin", "Germany", 52.5200, 13.4050, 5),
+    ("Amsterdam", "Netherlands", 52.3676, 4.9041, 3),
+    ("Stockholm", "Sweden", 59.3293, 18.0686, 2),
+    ("Moscow", "Russia", 55.7558, 37.6173, 4),
+    ("Dubai", "UAE", 25.2048, 55.2708, 3),
+    ("Nairobi", "Kenya", -1.2921, 36.8219, 2),
+    ("Cape Town", "South Africa", -33.9249, 18.4241, 2),
+    ("Mumbai", "India", 19.0760, 72.8777, 6),
+    ("Singapore", "Singapore", 1.3521, 103.8198, 4),
+    ("Bangkok", "Thailand", 13.7563, 100.5018, 3),
+    ("Beijing", "China", 39.9042, 116.4074, 6),
+    ("Seoul", "South Korea", 37.5665, 126.9780, 4),
+    ("Tokyo", "Japan", 35.6762, 139.6503, 8),
+    ("Sydney", "Australia", -33.8688, 151.2093, 3),
+]
+
+INDUSTRIES = [
+    "Technology",
+    "Manufacturing",
+    "Finance",
+    "Consulting",
+    "Renewable Energy",
+    "Software",
+    "Automotive",
+    "Fashion",
+    "Creative Arts",
+    "Biotechnology",
+    "Real Estate",
+]
+
+NAME_PREFIXES = ["Global", "Apex", "Blue", "Nova", "Prime", "Urban", "Vertex", "Zen"]
+NAME_SUFFIXES = ["Labs", "Systems", "Group", "Partners", "Works", "Holdings"]
+
+# Spread of companies around a hub, in kilometres
+HUB_SPREAD_KM = 15.0
+# Share of companies placed uniformly rather than around a hub
+NOISE_RATIO = 0.02
+
+_KM_PER_DEGREE = 111.32
+
+
+def generate_companies(count, seed=0):
+    """
+    Yield synthetic company rows as dictionaries.
+
+    Args:
+        count: Number of companies to generate
+        seed: Random seed, so runs are reproducible
+
+    Yields:
+        Dictionaries with name, industry, location, latitude and longitude
+    """
+    rng = random.Random(seed)
+    weights = [hub[4] for hub in HUBS]
+
+    for i in range(count):
+        if rng.random() < NOISE_RATIO:
+            latitude = math.degrees(math.asin(rng.uniform(-1, 1)))
+            longitude = rng.uniform(-180, 180)
+            location = "Remote"
+        else:
+            city, country, hub_lat, hub_lon, _ = rng.choices(HUBS, weights)[0]
+            spread = HUB_SPREAD_KM / _KM_PER_DEGREE
+            latitude = hub_lat + rng.gauss(0, spread)
+            longitude = hub_lon + rng.gauss(0, spread) / max(
+                math.cos(math.radians(hub_lat)), 0.01
+            )
+            location = f"{city}, {country}"
+
+        latitude = max(-90.0, min(90.0, latitude))
+        longitude = (longitude + 180.0) % 360.0 - 180.0
+
+        yield {
+            "name": f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)} {i}",
+            "industry": rng.choice(INDUSTRIES),
+            "location": location,
+            "latitude": round(latitude, 6),
+            "longitude": round(longitude, 6),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Remove existing companies before loading",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.truncate:
+        with engine.begin() as connection:
+            connection.execute(text("TRUNCATE TABLE companies RESTART IDENTITY"))
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        # Synthetic names are unique, so the existence check is not needed
+        _, loaded = load_companies(
+            connection,
+            generate_companies(args.count, args.seed),
+            chunk_size=args.chunk_size,
+            skip_existing=False,
+            progress=log_progress,
+        )
+        connection.execute(text("ANALYZE companies"))
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {loaded} companies in {elapsed:.1f}s ({loaded / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
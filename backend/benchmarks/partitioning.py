@@ -0,0 +1,228 @@
+"""
+Time typical queries and table maintenance, to compare table layouts.
+
+Run once on the plain table and once after partitioning it, then compare the
+two result files with ``benchmarks.compare``:
+
+    python -m benchmarks.partitioning --output before.json
+    alembic downgrade d8a3f1c6b2e4 && alembic -x partitions=8 upgrade head
+    python -m benchmarks.partitioning --output after.json
+    python -m benchmarks.compare before.json after.json
+
+Queries are run directly against the database, shaped like the ones the API
+issues, so the numbers reflect planning and execution rather than HTTP.
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text
+
+from app.database import DATABASE_URL
+from app.company_keys import geodesic_bounds, regions_for_bounds
+from benchmarks.datagen import HUBS
+from benchmarks.run import git_commit, summarise
+
+
+# Half-width in degrees of the square searched around a hub
+CITY_HALF_WIDTH = 0.1
+
+WITHIN_QUERY = text(
+    """
+    SELECT id, latitude, longitude FROM companies
+    WHERE ST_Intersects(
+        geom, ST_SetSRID(ST_GeomFromGeoJSON(:area), 4326)::geography
+    )
+      AND region = ANY(:regions)
+      AND id > 0
+    ORDER BY id
+    LIMIT 1001
+    """
+)
+
+
+def _city_query(rng):
+    _, _, latitude, longitude, _ = rng.choice(HUBS)
+    west, east = longitude - CITY_HALF_WIDTH, longitude + CITY_HALF_WIDTH
+    south, north = latitude - CITY_HALF_WIDTH, latitude + CITY_HALF_WIDTH
+    ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+    area = json.dumps({"type": "Polygon", "coordinates": [ring]})
+    return WITHIN_QUERY, {
+        "area": area,
+        "regions": regions_for_bounds(*geodesic_bounds(ring)),
+    }
+
+
+def _get_query(rng, max_id):
+    return text("SELECT * FROM companies WHERE id = :id"), {
+        "id": rng.randint(1, max_id)
+    }
+
+
+def _list_query(rng, total):
+    return text("SELECT * FROM companies OFFSET :skip LIMIT 100"), {
+        "skip": rng.randrange(max(total - 100, 1))
+    }
+
+
+def _sync_query(rng, max_version):
+    return text(
+        "SELECT * FROM companies WHERE row_version > :since "
+        "ORDER BY row_version LIMIT 501"
+    ), {"since": rng.randrange(max(max_version, 1))}
+
+
+def describe_layout(connection):
+    """
+    Report whether companies is partitioned, with row and partition counts.
+    """
+    partitions = connection.execute(
+        text(
+            "SELECT count(*) FROM pg_inherits "
+            "WHERE inhparent = 'companies'::regclass"
+        )
+    ).scalar()
+    return {
+        "partitions": partitions,
+        "rows": connection.execute(text("SELECT count(*) FROM companies")).scalar(),
+        "total_size_bytes": connection.execute(
+            text(
+                "SELECT coalesce(sum(pg_total_relation_size(relid)), 0) "
+                "FROM pg_partition_tree('companies')"
+            )
+        ).scalar(),
+    }
+
+
+def _leaf_tables(connection):
+    """The tables that actually hold rows, largest first."""
+    return [
+        row[0]
+        for row in connection.execute(
+            text(
+                "SELECT relid::regclass::text FROM pg_partition_tree('companies') "
+                "WHERE isleaf ORDER BY pg_total_relation_size(relid) DESC"
+            )
+        )
+    ]
+
+
+def time_queries(connection, repeat, seed):
+    """
+    Time each query shape ``repeat`` times with randomised parameters.
+
+    Returns:
+        Dictionary of summaries by query name
+    """
+    rng = random.Random(seed)
+    total, max_id, max_version = connection.execute(
+        text("SELECT count(*), max(id), max(row_version) FROM companies")
+    ).one()
+    shapes = {
+        "within": lambda: _city_query(rng),
+        "get": lambda: _get_query(rng, max_id or 1),
+        "list": lambda: _list_query(rng, total),
+        "sync": lambda: _sync_query(rng, max_version or 0),
+    }
+
+    results = {}
+    for name, make_query in shapes.items():
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            statement, parameters = make_query()
+            query_start = time.perf_counter()
+            connection.execute(statement, parameters).all()
+            latencies.append(time.perf_counter() - query_start)
+        results[name] = summarise(latencies, 0, time.perf_counter() - start)
+    return results
+
+
+def time_maintenance(connection):
+    """
+    Time VACUUM, ANALYZE and a rebuild of the spatial index.
+
+    ``reindex_largest`` rebuilds only the biggest leaf table, which is the
+    unit of maintenance once the table is partitioned.
+
+    Returns:
+        Dictionary of summaries by operation name
+    """
+    largest = _leaf_tables(connection)[0]
+    operations = {
+        "vacuum": "VACUUM companies",
+        "analyze": "ANALYZE companies",
+        "reindex_geom": "REINDEX INDEX idx_companies_geom",
+        "reindex_largest": f"REINDEX TABLE {largest}",
+    }
+
+    results = {}
+    for name, statement in operations.items():
+        start = time.perf_counter()
+        connection.execute(text(statement))
+        elapsed = time.perf_counter() - start
+        results[name] = summarise([elapsed], 0, elapsed)
+    return results
+
+
+def run(args):
+    engine = create_engine(args.database_url)
+    try:
+        # VACUUM and REINDEX cannot run inside a transaction block
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            layout = describe_layout(connection)
+            print(
+                f"{layout['rows']} rows, {layout['partitions'] or 'no'} partitions"
+            )
+            # Warm the cache so the first shape is not penalised
+            time_queries(connection, args.warmup, args.seed)
+            results = time_queries(connection, args.repeat, args.seed)
+            if not args.skip_maintenance:
+                results.update(time_maintenance(connection))
+    finally:
+        engine.dispose()
+
+    for name, summary in results.items():
+        print(
+            f"{name:>16}: p50 {summary['latency_ms']['p50']:.2f} ms  "
+            f"p95 {summary['latency_ms']['p95']:.2f} ms"
+        )
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "layout": layout,
+        "repeat": args.repeat,
+        "endpoints": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-maintenance",
+        action="store_true",
+        help="Only time queries; VACUUM and REINDEX lock the table",
+    )
+    parser.add_argument("--output", default="partitioning-results.json")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Concurrent load driver for the companies API.
+
+Each endpoint is exercised in its own phase by a pool of concurrent clients,
+and the per-endpoint throughput and latency percentiles are written as JSON
+so runs can be compared across commits with ``benchmarks.compare``.
+
+Usage:
+    python -m benchmarks.run --base-url http://localhost:8000 \\
+        --concurrency 32 --requests 2000 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.datagen import HUBS, generate_companies
+
+
+DEFAULT_PHASES = ["list", "get", "sync", "within", "create", "delete"]
+
+# Half-width in degrees of the square regions searched by the within phase
+WITHIN_HALF_WIDTH = 0.1
+
+# Marks companies created by the create phase, so they never share a dedup
+# key with rows loaded by benchmarks.datagen
+CREATE_NAME_PREFIX = "Benchmark"
+
+
+class BenchmarkState:
+    """
+    Data shared between phases, e.g. IDs to read and IDs to delete.
+    """
+
+    def __init__(self, total, known_ids, seed=0):
+        self.total = total
+        self.known_ids = known_ids
+        self.created_ids = []
+        self.payloads = (
+            {**row, "name": f"{CREATE_NAME_PREFIX} {row['name']}"}
+            for row in generate_companies(10**9, seed=seed)
+        )
+
+
+async def scenario_list(client, state, rng):
+    skip = rng.randrange(max(state.total - 100, 1))
+    return await client.get("/api/companies/", params={"skip": skip, "limit": 100})
+
+
+async def scenario_list_hot(client, state, rng):
+    # Every client asks for the same page, as when a popular map view loads
+    return await client.get(
+        "/api/companies/",
+        params={"skip": 0, "limit": 100, "fields": "id,latitude,longitude"},
+    )
+
+
+async def scenario_get(client, state, rng):
+    return await client.get(f"/api/companies/{rng.choice(state.known_ids)}")
+
+
+async def scenario_sync(client, state, rng):
+    # Versions are roughly dense over the table, so this asks for a batch of
+    # changes from a random point in its history
+    since = rng.randrange(max(state.total, 1))
+    return await client.get(
+        "/api/companies/sync", params={"since": since, "limit": 500}
+    )
+
+
+async def scenario_within(client, state, rng):
+    # A city-sized square around a random hub
+    _, _, latitude, longitude, _ = rng.choice(HUBS)
+    west, east = longitude - WITHIN_HALF_WIDTH, longitude + WITHIN_HALF_WIDTH
+    south, north = latitude - WITHIN_HALF_WIDTH, latitude + WITHIN_HALF_WIDTH
+    ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+    return await client.post(
+        "/api/companies/within",
+        json={"geometry": {"type": "Polygon", "coordinates": [ring]}},
+        params={"limit": 1000},
+    )
+
+
+async def scenario_create(client, state, rng):
+    response = await client.post("/api/companies/", json=next(state.payloads))
+    if response.is_success:
+        state.created_ids.append(response.json()["id"])
+    return response
+
+
+async def scenario_delete(client, state, rng):
+    if not state.created_ids:
+        raise LookupError("No created companies left to delete")
+    return await client.delete(f"/api/companies/{state.created_ids.pop()}")
+
+
+SCENARIOS = {
+    "list": scenario_list,
+    "list_hot": scenario_list_hot,
+    "get": scenario_get,
+    "sync": scenario_sync,
+    "within": scenario_within,
+    "create": scenario_create,
+    "delete": scenario_delete,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return round(sorted_values[min(index, len(sorted_values) - 1)], 3)
+
+
+def summarise(latencies, errors, elapsed):
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    count = len(latencies_ms)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies_ms) / count, 3) if count else None,
+            "p50": percentile(latencies_ms, 0.50),
+            "p95": percentile(latencies_ms, 0.95),
+            "p99": percentile(latencies_ms, 0.99),
+            "max": round(latencies_ms[-1], 3) if count else None,
+        },
+    }
+
+
+async def run_phase(client, scenario, state, concurrency, requests, seed):
+    """
+    Drive one scenario with a pool of concurrent clients.
+
+    Returns:
+        Summary of throughput and latency for the phase
+    """
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(seed + worker_id)
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, state, rng)
+                ok = response.is_success
+            except (httpx.HTTPError, LookupError):
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarise(latencies, errors, time.perf_counter() - start)
+
+
+async def load_state(client, seed):
+    """Discover the dataset the server is running against."""
+    listing = (await client.get("/api/companies/", params={"limit": 1})).json()
+    total = listing["total"]
+    if not total:
+        raise SystemExit("No companies found; load data with benchmarks.datagen first")
+
+    # Sample IDs from a few random pages so reads are spread over the table
+    rng = random.Random(seed)
+    known_ids = []
+    for _ in range(5):
+        page = await client.get(
+            "/api/companies/",
+            params={"skip": rng.randrange(max(total - 200, 1)), "limit": 200},
+        )
+        known_ids.extend(company["id"] for company in page.json()["companies"])
+    return BenchmarkState(total, known_ids, seed)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        state = await load_state(client, args.seed)
+        results = {}
+        for phase in args.phases:
+            scenario = SCENARIOS[phase]
+            if args.warmup:
+                await run_phase(
+                    client, scenario, state, args.concurrency, args.warmup, args.seed
+                )
+            results[phase] = await run_phase(
+                client, scenario, state, args.concurrency, args.requests, args.seed
+            )
+            summary = results[phase]
+            print(
+                f"{phase:>8}: {summary['throughput_rps']:>8} req/s  "
+                f"p50 {summary['latency_ms']['p50']:.1f} ms  "
+                f"p95 {summary['latency_ms']['p95']:.1f} ms  "
+                f"p99 {summary['latency_ms']['p99']:.1f} ms  "
+                f"errors {summary['errors']}"
+            )
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests_per_phase": args.requests,
+        "dataset": {"total": state.total},
+        "endpoints": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--phases",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=DEFAULT_PHASES,
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Gunicorn configuration for production.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+bind = f"{os.getenv('BACKEND_HOST', '0.0.0.0')}:{os.getenv('BACKEND_PORT', '8000')}"
+# Metrics, the slow-query log and single-flight state live in each worker's
+# memory, so /metrics and the admin endpoints only report the worker that
+# answered; use one worker when complete figures from one endpoint matter
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "app.server.UvicornWorker"
+
+# Import the app once in the master so workers fork from a warm process
+preload_app = True
+
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+# Heartbeat files on tmpfs, so a slow disk cannot get workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def on_starting(server):
+    """Run migrations and warm-up once, in the master, before forking."""
+    from app.server import run_migrations, warm_up
+
+    if os.getenv("RUN_MIGRATIONS", "true").lower() in ("1", "true", "yes"):
+        run_migrations()
+    warm_up()
+
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master."""
+    from app.database import engine
+
+    engine.dispose(close=False)
@@ -0,0 +1,84 @@
+"""
+Helpers shared by the PostGIS integration tests and benchmarks.
+"""
+
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.main import app
+
+
+@contextmanager
+def rolled_back_session(engine):
+    """
+    Session whose changes are rolled back on exit.
+
+    ``commit()`` inside the app releases a SAVEPOINT instead of committing,
+    and the outer transaction is rolled back at the end.
+
+    Args:
+        engine: Engine of the database to use
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(
+        bind=connection,
+        autoflush=False,
+        join_transaction_mode="create_savepoint",
+    )
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@contextmanager
+def client_for(session):
+    """
+    TestClient whose requests all use the given session.
+
+    Args:
+        session: Session to hand to every request instead of get_db's
+    """
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: session
+    try:
+        yield TestClient(app)
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
+
+
+def explain(session, statement, parameters=None):
+    """
+    Return the root node of a statement's JSON plan.
+
+    Args:
+        session: Session to run EXPLAIN on
+        statement: SQL text of the statement
+        parameters: Bound parameters for the statement
+    """
+    plan = session.execute(
+        text(f"EXPLAIN (FORMAT JSON) {statement}"), parameters or {}
+    ).scalar()
+    return plan[0]["Plan"]
+
+
+def plan_nodes(plan):
+    """Yield every node in a plan tree."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def index_names(plan):
+    """Names of the indexes a plan reads."""
+    return {node["Index Name"] for node in plan_nodes(plan) if "Index Name" in node}
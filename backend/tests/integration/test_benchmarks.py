@@ -0,0 +1,150 @@
+"""
+Latency and query-plan regression benchmarks against a seeded PostGIS database.
+
+Run with ``make backend-bench-test``; pytest-benchmark keeps each run under
+``.benchmarks`` and ``--benchmark-compare-fail=mean:20%`` fails the run when
+an endpoint gets slower than the saved baseline. The plan tests fail as soon
+as a query stops using the index it was written for.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+from benchmarks.datagen import generate_companies
+from app.dataload import load_companies
+from tests.integration.support import (
+    client_for,
+    explain,
+    index_names,
+    rolled_back_session,
+)
+
+pytest.importorskip("pytest_benchmark")
+
+BENCHMARK_ROWS = int(os.getenv("BENCHMARK_ROWS", "20000"))
+BENCHMARK_SEED = 42
+
+# Around San Francisco, one of the generator's busiest hubs
+RADIUS_QUERY = (
+    "SELECT id, name, latitude, longitude FROM companies "
+    "WHERE ST_DWithin(geom, ST_GeogFromText('SRID=4326;POINT(-122.42 37.77)'), "
+    ":radius)"
+)
+
+# Around the London hub; the geometry is passed as GeoJSON like the API does
+LONDON = (
+    '{"type": "Polygon", "coordinates": [[[-0.2, 51.45], [0.0, 51.45], '
+    '[0.0, 51.55], [-0.2, 51.55], [-0.2, 51.45]]]}'
+)
+REGION_QUERY = (
+    "SELECT id FROM companies WHERE ST_Intersects(geom, "
+    "ST_SetSRID(ST_GeomFromGeoJSON(:region), 4326)::geography) "
+    "AND id > 0 ORDER BY id LIMIT 1001"
+)
+
+
+@pytest.fixture(scope="module")
+def bench_engine(make_database):
+    """Clone of the template seeded once with synthetic companies."""
+    engine = make_database("geo_tagging_bench")
+    with engine.begin() as connection:
+        load_companies(
+            connection,
+            generate_companies(BENCHMARK_ROWS, seed=BENCHMARK_SEED),
+            skip_existing=False,
+        )
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        connection.execute(text("VACUUM ANALYZE companies"))
+    return engine
+
+
+@pytest.fixture
+def bench_session(bench_engine):
+    """Rolled-back session on the seeded database."""
+    with rolled_back_session(bench_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def bench_client(bench_session):
+    """TestClient on the seeded database."""
+    with client_for(bench_session) as client:
+        yield client
+
+
+class TestEndpointBenchmarks:
+    """Latency benchmarks for the hot read endpoints."""
+
+    def test_list_page(self, benchmark, bench_client):
+        """Benchmark a full page of the company list."""
+        response = benchmark(bench_client.get, "/api/companies/?limit=100")
+        assert response.status_code == 200
+        assert response.json()["total"] == BENCHMARK_ROWS
+
+    def test_list_markers(self, benchmark, bench_client):
+        """Benchmark a markers-only list page."""
+        response = benchmark(
+            bench_client.get,
+            "/api/companies/?limit=1000&fields=id,latitude,longitude",
+        )
+        assert response.status_code == 200
+        assert len(response.json()["companies"]) == 1000
+
+    def test_sync_page(self, benchmark, bench_client):
+        """Benchmark the first sync batch of a fresh client."""
+        response = benchmark(
+            bench_client.get, "/api/companies/sync?since=0&limit=500"
+        )
+        assert response.status_code == 200
+        assert response.json()["has_more"]
+
+    def test_within_region(self, benchmark, bench_client):
+        """Benchmark a page of companies inside a city-sized polygon."""
+        body = {"geometry": json.loads(LONDON)}
+        response = benchmark(bench_client.post, "/api/companies/within", json=body)
+        assert response.status_code == 200
+        assert response.json()["companies"]
+
+    def test_radius_query(self, benchmark, bench_session):
+        """Benchmark a 25 km radius query on the geography column."""
+        rows = benchmark(
+            lambda: bench_session.execute(
+                text(RADIUS_QUERY), {"radius": 25000}
+            ).all()
+        )
+        assert rows
+
+
+class TestQueryPlans:
+    """Checks that the spatial and list queries keep using their indexes."""
+
+    def test_radius_query_uses_gist_index(self, bench_session):
+        """Test that radius queries read the GiST index."""
+        plan = explain(bench_session, RADIUS_QUERY, {"radius": 25000})
+        assert "idx_companies_geom" in index_names(plan)
+
+    def test_region_query_uses_gist_index(self, bench_session):
+        """Test that polygon searches read the GiST index."""
+        plan = explain(bench_session, REGION_QUERY, {"region": LONDON})
+        assert "idx_companies_geom" in index_names(plan)
+
+    def test_sync_uses_row_version_index(self, bench_session):
+        """Test that sync batches read the row_version index, not the table."""
+        plan = explain(
+            bench_session,
+            "SELECT * FROM companies WHERE row_version > :since "
+            "ORDER BY row_version LIMIT 501",
+            {"since": 0},
+        )
+        assert "ix_companies_row_version" in index_names(plan)
+
+    def test_get_by_id_uses_index(self, bench_session):
+        """Test that single-company lookups are index scans."""
+        plan = explain(
+            bench_session, "SELECT * FROM companies WHERE id = :id", {"id": 1}
+        )
+        assert index_names(plan) & {"companies_pkey", "ix_companies_id"}
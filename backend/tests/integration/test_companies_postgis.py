@@ -0,0 +1,382 @@
+"""
+Integration tests for companies API endpoints against PostGIS.
+"""
+import json
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app import write_behind
+from app.dataload import load_companies
+from app.models.company import Company
+from app.routes import companies as companies_routes
+from tests.integration.support import client_for, explain, index_names
+
+
+# Roughly the San Francisco Bay Area
+BAY_AREA = {
+    "type": "Polygon",
+    "coordinates": [
+        [[-123.0, 37.0], [-121.5, 37.0], [-121.5, 38.2], [-123.0, 38.2], [-123.0, 37.0]]
+    ],
+}
+
+INSERT_COMPANY = text(
+    "INSERT INTO companies "
+    "(name, industry, location, latitude, longitude, geom, region) "
+    "VALUES (:name, 'Technology', 'Null Island', 0, 0, "
+    "'SRID=4326;POINT(0 0)', 24) RETURNING row_version"
+)
+
+
+@pytest.fixture
+def sample_company_data():
+    """Sample company data for testing."""
+    return {
+        "name": "Test Company",
+        "industry": "Technology",
+        "location": "San Francisco, CA",
+        "latitude": 37.7749,
+        "longitude": -122.4194
+    }
+
+
+class TestCompaniesPostGIS:
+    """Test cases for the spatial side of the companies API."""
+
+    def test_starts_empty(self, pg_client):
+        """Test that each test starts from an empty, rolled-back database."""
+        response = pg_client.get("/api/companies/")
+        assert response.status_code == 200
+        assert response.json()["total"] == 0
+
+    def test_create_stores_geography(self, pg_client, pg_session, sample_company_data):
+        """Test that a created company gets a matching geography point."""
+        response = pg_client.post("/api/companies/", json=sample_company_data)
+        assert response.status_code == 201
+
+        longitude, latitude = pg_session.execute(
+            text(
+                "SELECT ST_X(geom::geometry), ST_Y(geom::geometry) "
+                "FROM companies WHERE id = :id"
+            ),
+            {"id": response.json()["id"]},
+        ).one()
+        assert longitude == pytest.approx(sample_company_data["longitude"])
+        assert latitude == pytest.approx(sample_company_data["latitude"])
+
+    def test_distance_query(self, pg_client, pg_session, sample_company_data):
+        """Test that ST_DWithin finds nearby companies on the geography column."""
+        pg_client.post("/api/companies/", json=sample_company_data)
+        far_away = {**sample_company_data, "name": "Far Company", "longitude": 0.0}
+        pg_client.post("/api/companies/", json=far_away)
+
+        point = func.ST_GeogFromText("SRID=4326;POINT(-122.42 37.77)")
+        names = pg_session.scalars(
+            select(Company.name).where(func.ST_DWithin(Company.geom, point, 5000))
+        ).all()
+        assert names == [sample_company_data["name"]]
+
+    def test_sparse_fields(self, pg_client, sample_company_data):
+        """Test that fields= returns only those fields, rounded like full ones."""
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "latitude": 37.123456789},
+        )
+
+        full = pg_client.get("/api/companies/").json()["companies"][0]
+        response = pg_client.get("/api/companies/?fields=id,latitude,longitude")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["companies"] == [
+            {key: full[key] for key in ("id", "latitude", "longitude")}
+        ]
+        assert data["companies"][0]["latitude"] == 37.123457
+
+    def test_sparse_fields_reject_unknown(self, pg_client):
+        """Test that fields outside the company response are rejected."""
+        response = pg_client.get("/api/companies/?fields=id,geom")
+        assert response.status_code == 422
+        assert "geom" in response.json()["detail"]
+
+    def test_dedup_upsert(self, pg_client, sample_company_data, monkeypatch):
+        """Test that dedup mode returns the existing company on a repeat create."""
+        monkeypatch.setattr(companies_routes, "COMPANY_DEDUP_MODE", "ignore")
+
+        first = pg_client.post("/api/companies/", json=sample_company_data)
+        again = pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "name": "  test   COMPANY "},
+        )
+        assert first.status_code == 201
+        assert again.status_code == 200
+        assert again.json()["id"] == first.json()["id"]
+
+    def test_duplicates_keep_the_first_key_when_dedup_is_off(
+        self, pg_client, pg_session, sample_company_data
+    ):
+        """Test that dedup can be turned on later for companies created without it."""
+        first = pg_client.post("/api/companies/", json=sample_company_data)
+        again = pg_client.post("/api/companies/", json=sample_company_data)
+        assert first.status_code == again.status_code == 201
+
+        keys = dict(
+            pg_session.execute(select(Company.id, Company.dedup_key)).all()
+        )
+        assert keys[first.json()["id"]] == "test company|37.7749|-122.4194"
+        assert keys[again.json()["id"]] is None
+
+    def test_idempotent_create_bypasses_write_behind(
+        self, pg_client, sample_company_data, monkeypatch
+    ):
+        """Test that keyed creates commit with their idempotency record."""
+        # The queue is not running, so a queued create would get a 503
+        monkeypatch.setattr(companies_routes, "WRITE_BEHIND_ENABLED", True)
+        headers = {"Idempotency-Key": "write-behind-key"}
+
+        first = pg_client.post(
+            "/api/companies/", json=sample_company_data, headers=headers
+        )
+        again = pg_client.post(
+            "/api/companies/", json=sample_company_data, headers=headers
+        )
+        assert first.status_code == 201
+        assert again.json() == first.json()
+        assert again.headers["Idempotent-Replayed"] == "true"
+
+    def test_write_behind_retry_after_commit(self, pg_engine, monkeypatch):
+        """Test that rewriting a batch that already committed is a no-op."""
+        monkeypatch.setattr(write_behind, "engine", pg_engine)
+        ids = write_behind.reserve_ids(2)
+        rows = [
+            {
+                "id": company_id,
+                "name": name,
+                "industry": "Technology",
+                "location": "Null Island",
+                "latitude": 0.0,
+                "longitude": 0.0,
+                "geom": "SRID=4326;POINT(0 0)",
+                "dedup_key": f"{name.lower()}|0|0",
+                "region": 24,
+            }
+            for company_id, name in zip(ids, ("First", "Second"))
+        ]
+        try:
+            write_behind.insert_rows(rows)
+            # As if the commit was lost on the way back and the batch retried
+            write_behind.insert_rows(rows)
+            with pg_engine.connect() as connection:
+                names = connection.execute(
+                    select(Company.name).where(Company.id.in_(ids)).order_by(Company.id)
+                ).scalars().all()
+            assert names == ["First", "Second"]
+        finally:
+            with pg_engine.begin() as connection:
+                connection.execute(Company.__table__.delete().where(Company.id.in_(ids)))
+
+    def test_sync_returns_created_companies(self, pg_client, sample_company_data):
+        """Test that a full sync includes new companies and ends at the latest."""
+        company_id = pg_client.post(
+            "/api/companies/", json=sample_company_data
+        ).json()["id"]
+
+        data = pg_client.get("/api/companies/sync").json()
+        assert [company["id"] for company in data["changes"]] == [company_id]
+        assert data["version"] == data["changes"][0]["row_version"]
+        assert data["has_more"] is False
+
+        data = pg_client.get(f"/api/companies/sync?since={data['version']}").json()
+        assert data["changes"] == []
+        assert data["deleted"] == []
+
+    def test_sync_batches(self, pg_client, sample_company_data):
+        """Test that changes are split into batches of the requested size."""
+        for name in ("First", "Second"):
+            pg_client.post(
+                "/api/companies/", json={**sample_company_data, "name": name}
+            )
+
+        first = pg_client.get("/api/companies/sync?limit=1").json()
+        assert [company["name"] for company in first["changes"]] == ["First"]
+        assert first["has_more"] is True
+        second = pg_client.get(
+            f"/api/companies/sync?since={first['version']}&limit=1"
+        ).json()
+        assert [company["name"] for company in second["changes"]] == ["Second"]
+        assert second["has_more"] is False
+
+    def test_sync_reports_deletes(self, pg_client, sample_company_data):
+        """Test that deletes show up as tombstones in the sync feed."""
+        company_id = pg_client.post(
+            "/api/companies/", json=sample_company_data
+        ).json()["id"]
+        version = pg_client.get("/api/companies/sync").json()["version"]
+
+        pg_client.delete(f"/api/companies/{company_id}")
+        data = pg_client.get(f"/api/companies/sync?since={version}").json()
+        assert data["deleted"] == [company_id]
+        assert data["changes"] == []
+
+    def test_row_versions_commit_in_order(self, pg_engine):
+        """Test that sync never skips a version still being written."""
+        with pg_engine.connect() as first, pg_engine.connect() as second:
+            first_version = first.execute(INSERT_COMPANY, {"name": "First"}).scalar()
+            second_version = second.execute(
+                INSERT_COMPANY, {"name": "Second"}
+            ).scalar()
+            assert second_version > first_version
+            second.commit()
+
+            try:
+                with Session(bind=pg_engine) as session, client_for(
+                    session
+                ) as client:
+                    since = first_version - 1
+                    data = client.get(f"/api/companies/sync?since={since}").json()
+                    # Second is committed but may not be reported past First
+                    assert data["changes"] == []
+                    assert data["version"] == since
+
+                    first.commit()
+                    data = client.get(f"/api/companies/sync?since={since}").json()
+                    assert [row["name"] for row in data["changes"]] == [
+                        "First",
+                        "Second",
+                    ]
+                    assert data["version"] == second_version
+            finally:
+                first.rollback()
+                second.execute(
+                    text("DELETE FROM companies WHERE name IN ('First', 'Second')")
+                )
+                second.commit()
+
+    def test_bulk_load(self, pg_session):
+        """Test that the bulk loader is idempotent inside the test transaction."""
+        rows = [
+            {
+                "name": f"Company {i}",
+                "industry": "Technology",
+                "location": "Nairobi, Kenya",
+                "latitude": -1.28 + i / 100,
+                "longitude": 36.82,
+            }
+            for i in range(10)
+        ]
+        connection = pg_session.connection()
+        assert load_companies(connection, rows) == (10, 10)
+        assert load_companies(connection, rows) == (10, 0)
+
+    def test_within_region(self, pg_client, sample_company_data):
+        """Test that only companies inside the region are returned."""
+        pg_client.post("/api/companies/", json=sample_company_data)
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "name": "Oakland Company", "longitude": -122.27},
+        )
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "name": "London Company", "longitude": 0.0},
+        )
+
+        response = pg_client.post(
+            "/api/companies/within", json={"geometry": BAY_AREA}
+        )
+        assert response.status_code == 200
+        names = {company["name"] for company in response.json()["companies"]}
+        assert names == {"Test Company", "Oakland Company"}
+        assert response.json()["next_after_id"] is None
+
+    def test_within_industry_and_paging(self, pg_client, sample_company_data):
+        """Test the industry filter and keyset paging of region searches."""
+        for i in range(3):
+            pg_client.post(
+                "/api/companies/",
+                json={**sample_company_data, "name": f"Tech {i}", "latitude": 37.5 + i / 10},
+            )
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "name": "Bank", "industry": "Finance"},
+        )
+
+        body = {"geometry": BAY_AREA, "industry": "Technology"}
+        first = pg_client.post("/api/companies/within?limit=2", json=body).json()
+        assert len(first["companies"]) == 2
+        second = pg_client.post(
+            f"/api/companies/within?limit=2&after_id={first['next_after_id']}",
+            json=body,
+        ).json()
+        assert second["next_after_id"] is None
+        names = [c["name"] for c in first["companies"] + second["companies"]]
+        assert sorted(names) == ["Tech 0", "Tech 1", "Tech 2"]
+
+    def test_within_stream(self, pg_client, sample_company_data):
+        """Test that stream=true returns every match as NDJSON in ID order."""
+        for i in range(3):
+            pg_client.post(
+                "/api/companies/",
+                json={**sample_company_data, "name": f"Tech {i}", "latitude": 37.5 + i / 10},
+            )
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "name": "London Company", "longitude": 0.0},
+        )
+
+        response = pg_client.post(
+            "/api/companies/within?stream=true&fields=id,name",
+            json={"geometry": BAY_AREA},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["name"] for row in rows] == ["Tech 0", "Tech 1", "Tech 2"]
+        assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+    def test_within_serialises_every_path_alike(self, pg_client, sample_company_data):
+        """Test that pages, trimmed pages and streams round coordinates alike."""
+        pg_client.post(
+            "/api/companies/",
+            json={**sample_company_data, "latitude": 37.123456789},
+        )
+        search = {"geometry": BAY_AREA}
+
+        page = pg_client.post("/api/companies/within", json=search).json()
+        trimmed = pg_client.post(
+            "/api/companies/within?fields=latitude", json=search
+        ).json()
+        stream = pg_client.post(
+            "/api/companies/within?stream=true", json=search
+        ).text.splitlines()
+
+        assert page["companies"][0]["latitude"] == 37.123457
+        assert trimmed["companies"] == [
+            {"id": page["companies"][0]["id"], "latitude": 37.123457}
+        ]
+        assert [json.loads(line) for line in stream] == page["companies"]
+
+    def test_within_simplifies_large_regions(
+        self, pg_client, sample_company_data, monkeypatch
+    ):
+        """Test that regions over the simplify threshold are simplified."""
+        monkeypatch.setattr(companies_routes, "WITHIN_SIMPLIFY_VERTICES", 4)
+        pg_client.post("/api/companies/", json=sample_company_data)
+
+        response = pg_client.post(
+            "/api/companies/within?fields=id",
+            json={"geometry": BAY_AREA},
+        )
+        assert response.headers["Region-Simplified"] == "true"
+        assert len(response.json()["companies"]) == 1
+
+    def test_spatial_index_used(self, pg_session):
+        """Test that radius queries can use the GiST index."""
+        pg_session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = explain(
+            pg_session,
+            "SELECT id FROM companies WHERE ST_DWithin(geom, "
+            "ST_GeogFromText('SRID=4326;POINT(0 0)'), 1000)",
+        )
+        assert "idx_companies_geom" in index_names(plan)
@@ -0,0 +1,29 @@
+"""
+Tests for the benchmark driver's statistics and create payloads.
+"""
+from benchmarks.datagen import generate_companies
+from benchmarks.run import BenchmarkState, percentile
+
+
+class TestPercentile:
+    """Test cases for nearest-rank percentiles."""
+
+    def test_nearest_rank(self):
+        """Test that percentiles pick the ceil(fraction * n)-th value."""
+        values = list(range(1, 101))
+        assert percentile(values, 0.50) == 50
+        assert percentile(values, 0.95) == 95
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.95) == 7
+        assert percentile([], 0.95) is None
+
+
+class TestBenchmarkState:
+    """Test cases for data shared between benchmark phases."""
+
+    def test_create_payloads_differ_from_loaded_rows(self):
+        """Test that creates cannot collide with seeded companies in dedup mode."""
+        state = BenchmarkState(total=10, known_ids=[1], seed=0)
+        loaded = {row["name"] for row in generate_companies(100, seed=0)}
+        created = {next(state.payloads)["name"] for _ in range(100)}
+        assert not loaded & created
@@ -169,6 +169,32 @@ class TestCompaniesAPI:
         assert response.status_code == 422
 
 
+class TestIdempotentCreate:
+    """Test cases for Idempotency-Key handling on create."""
+
+    def test_retry_with_same_key_replays_response(self, test_db, sample_company_data):
+        """Test that a retried create returns the original company."""
+        headers = {"Idempotency-Key": "retry-same-key"}
+        first = client.post("/api/companies/", json=sample_company_data, headers=headers)
+        second = client.post(
+            "/api/companies/", json=sample_company_data, headers=headers
+        )
+
+        assert first.status_code == 201
+        assert second.status_code == 201
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+
+    def test_key_reuse_with_different_payload(self, test_db, sample_company_data):
+        """Test that reusing a key for another request is rejected."""
+        headers = {"Idempotency-Key": "reused-key"}
+        client.post("/api/companies/", json=sample_company_data, headers=headers)
+
+        other = dict(sample_company_data, name="Other Company")
+        response = client.post("/api/companies/", json=other, headers=headers)
+        assert response.status_code == 422
+
+
 class TestRootEndpoints:
     """Test cases for root endpoints."""
 
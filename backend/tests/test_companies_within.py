@@ -0,0 +1,42 @@
+"""
+Tests for validating region searches, which are rejected before any query.
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import companies as companies_routes
+
+
+client = TestClient(app)
+
+
+class TestCompaniesWithin:
+    """Test cases for validating region searches."""
+
+    def test_vertex_limit(self, monkeypatch):
+        """Test that regions over the vertex limit are rejected."""
+        monkeypatch.setattr(companies_routes, "WITHIN_MAX_VERTICES", 4)
+        square = [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]
+        response = client.post(
+            "/api/companies/within",
+            json={"geometry": {"type": "Polygon", "coordinates": [square]}},
+        )
+        assert response.status_code == 422
+        assert "5 vertices" in response.json()["detail"]
+
+    def test_open_ring_rejected(self):
+        """Test that polygons whose rings are not closed are rejected."""
+        ring = [[0, 0], [1, 0], [1, 1], [0, 1]]
+        response = client.post(
+            "/api/companies/within",
+            json={"geometry": {"type": "Polygon", "coordinates": [ring]}},
+        )
+        assert response.status_code == 422
+
+    def test_point_rejected(self):
+        """Test that geometries other than polygons are rejected."""
+        response = client.post(
+            "/api/companies/within",
+            json={"geometry": {"type": "Point", "coordinates": [0, 0]}},
+        )
+        assert response.status_code == 422
@@ -0,0 +1,108 @@
+"""
+Tests for company dedup keys and regions.
+
+These are plain functions, so they are kept apart from the API tests, which
+need a database.
+"""
+from app.company_keys import (
+    REGION_COUNT,
+    company_region,
+    geodesic_bounds,
+    make_dedup_key,
+    regions_for_bounds,
+)
+from app.models.company import Company
+from app.routes.companies import _candidate_regions
+from app.schemas.company import GeoJSONPolygon
+
+
+class TestDedupKey:
+    """Test cases for the company deduplication key."""
+
+    def test_name_is_normalised(self):
+        """Test that case and whitespace differences share a key."""
+        assert make_dedup_key("  Tech   Innovate ", 1.0, 2.0) == make_dedup_key(
+            "tech innovate", 1.0, 2.0
+        )
+
+    def test_coordinates_are_snapped(self):
+        """Test that nearby coordinates share a key at the default precision."""
+        assert make_dedup_key("A", 37.77491, -122.41941) == "a|37.7749|-122.4194"
+
+    def test_rounding_matches_postgres_numeric(self):
+        """Test half-up rounding and the absence of negative zero."""
+        assert make_dedup_key("A", 37.77495, -0.00001) == "a|37.7750|0.0000"
+
+    def test_new_companies_get_a_key(self):
+        """Test that every company gets a key, whatever the dedup mode."""
+        company = Company(
+            name="Test  Company",
+            industry="Technology",
+            location="San Francisco, CA",
+            latitude=37.7749,
+            longitude=-122.4194,
+        )
+        assert company.dedup_key == "test company|37.7749|-122.4194"
+
+
+class TestCompanyRegion:
+    """Test cases for the geohash region used as the partition key."""
+
+    def test_matches_geohash_first_character(self):
+        """Test that regions index the one-character geohash cells."""
+        base32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+        assert base32[company_region(37.7749, -122.4194)] == "9"
+        assert base32[company_region(51.5074, -0.1278)] == "g"
+        assert base32[company_region(-33.8688, 151.2093)] == "r"
+
+    def test_region_follows_dedup_snapping(self):
+        """Test that points sharing a dedup key share a region across a cell edge."""
+        assert company_region(10.0, 44.99996) == company_region(10.0, 45.0)
+
+    def test_bounds_cover_cell_edges(self):
+        """Test that a box touching a cell edge includes both cells."""
+        regions = regions_for_bounds(-0.2, 51.45, 0.0, 51.55)
+        assert regions == sorted(
+            {company_region(51.5, -0.1), company_region(51.5, 0.1)}
+        )
+
+    def test_geodesic_bounds_include_edge_bulge(self):
+        """Test that long east-west edges widen the latitude range poleward."""
+        ring = [[-100, 44], [100, 44], [100, 40], [-100, 40], [-100, 44]]
+        _, south, _, north = geodesic_bounds(ring)
+        assert south == 40
+        assert north > 45
+
+    def test_antimeridian_regions(self):
+        """Test that edges crossing the antimeridian take the short way round."""
+        polygon = GeoJSONPolygon(
+            type="Polygon",
+            coordinates=[[[120, -50], [-120, -50], [-120, 10], [120, 10], [120, -50]]],
+        )
+        west, _, east, _ = geodesic_bounds(polygon.coordinates[0])
+        assert (west, east) == (120, -120)
+
+        places = {
+            "Auckland": (-36.8485, 174.7633),
+            "Fiji": (-17.7134, 178.065),
+            "Samoa": (-13.759, -172.1046),
+        }
+        for simplified in (False, True):
+            regions = _candidate_regions(polygon, simplified)
+            for latitude, longitude in places.values():
+                assert company_region(latitude, longitude) in regions
+            assert company_region(51.5074, -0.1278) not in regions
+
+    def test_bounds_touching_the_antimeridian(self):
+        """Test that points stored at -180 are covered by boxes ending at 180."""
+        regions = regions_for_bounds(170, 0, 180, 5)
+        assert company_region(2, -180) in regions
+        assert company_region(2, 175) in regions
+
+    def test_rings_around_a_pole_cover_the_globe(self):
+        """Test that a ring winding around a pole gets every region."""
+        ring = [[-170, 60], [-10, 60], [10, 60], [170, 60], [-170, 60]]
+        assert geodesic_bounds(ring) == (-180, -90, 180, 90)
+        assert regions_for_bounds(*geodesic_bounds(ring)) == list(
+            range(REGION_COUNT)
+        )
@@ -0,0 +1,124 @@
+"""
+Tests for the bulk data loader's file readers and row validation.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import dataload
+
+
+SEED_FILE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "data", "seed_companies.csv"
+)
+
+
+class TestReaders:
+    """Test cases for reading CSV and GeoJSON data files."""
+
+    def test_read_seed_csv(self):
+        """Test that the bundled seed dataset parses."""
+        rows = list(dataload.read_file(SEED_FILE))
+        assert len(rows) == 20
+        assert rows[0]["name"] == "Tech Innovate"
+        assert rows[0]["location"] == "San Francisco, CA, USA"
+
+    def test_read_geojson(self, tmp_path):
+        """Test that Point features take coordinates from the geometry."""
+        path = tmp_path / "companies.geojson"
+        path.write_text(
+            json.dumps(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": {"type": "Point", "coordinates": [36.82, -1.29]},
+                            "properties": {
+                                "name": "Nairobi Innovations",
+                                "industry": "Technology",
+                                "location": "Nairobi, Kenya",
+                            },
+                        }
+                    ],
+                }
+            )
+        )
+
+        [row] = dataload.read_file(str(path))
+        assert row["latitude"] == -1.29
+        assert row["longitude"] == 36.82
+        assert row["name"] == "Nairobi Innovations"
+
+    def test_unsupported_extension(self):
+        """Test that unknown file types are rejected."""
+        with pytest.raises(ValueError):
+            dataload.read_file("companies.xlsx")
+
+
+class TestRowValidation:
+    """Test cases for row validation and COPY encoding."""
+
+    def test_clean_row_coerces_coordinates(self):
+        """Test that string coordinates from CSV become floats."""
+        row = {
+            "name": "Test Company",
+            "industry": "Technology",
+            "location": "San Francisco, CA",
+            "latitude": "37.7749",
+            "longitude": "-122.4194",
+        }
+        assert dataload._clean_row(row, 1) == (
+            "Test Company",
+            "Technology",
+            "San Francisco, CA",
+            37.7749,
+            -122.4194,
+            "test company|37.7749|-122.4194",
+            9,
+        )
+
+    def test_clean_row_rejects_invalid_latitude(self):
+        """Test that out-of-range coordinates are reported with the row number."""
+        row = {
+            "name": "Test Company",
+            "industry": "Technology",
+            "location": "Nowhere",
+            "latitude": 200,
+            "longitude": 0,
+        }
+        with pytest.raises(ValueError, match="Row 7"):
+            dataload._clean_row(row, 7)
+
+    def test_copy_buffer_escapes_special_characters(self):
+        """Test that tabs and newlines cannot break the COPY stream."""
+        buffer = dataload._copy_buffer([("A\tB", "C\nD", "E\\F", 1.0, 2.0)])
+        assert buffer.read() == "A\\tB\tC\\nD\tE\\\\F\t1.0\t2.0\n"
+
+
+class TestInsertStatement:
+    """Test cases for the statement that moves staged rows into companies."""
+
+    def test_idempotent_load_skips_duplicates(self):
+        """Test that idempotent loads drop repeats and existing companies."""
+        statement = dataload._insert_statement(True, True, True)
+        assert "DISTINCT ON (s.dedup_key)" in statement
+        assert "ON CONFLICT (dedup_key, region) DO NOTHING" in statement
+
+    def test_allow_duplicates_skips_the_sort(self):
+        """Test that non-idempotent loads insert staged rows as they are."""
+        statement = dataload._insert_statement(False, True, True)
+        assert "DISTINCT" not in statement
+        assert "ON CONFLICT" not in statement
+
+    def test_loader_does_not_import_models(self):
+        """Test that migrations using the loader stay independent of the models."""
+        code = (
+            "import sys, app.dataload; "
+            "sys.exit('app.models' in sys.modules or 'app.database' in sys.modules)"
+        )
+        backend = os.path.join(os.path.dirname(__file__), os.pardir)
+        assert subprocess.run([sys.executable, "-c", code], cwd=backend).returncode == 0
@@ -0,0 +1,61 @@
+"""
+Tests for request metrics and the Prometheus exposition format.
+"""
+from sqlalchemy import create_engine, text
+
+from app import metrics
+
+
+class TestHistogram:
+    """Test cases for the histogram metric."""
+
+    def test_observe_fills_cumulative_buckets(self):
+        """Test that an observation counts towards every bucket above it."""
+        histogram = metrics.Histogram("test_seconds", "Test.", ("route",), (0.1, 1.0))
+        histogram.observe(0.5, "/a")
+
+        lines = histogram.render()
+        assert 'test_seconds_bucket{route="/a",le="0.1"} 0' in lines
+        assert 'test_seconds_bucket{route="/a",le="1.0"} 1' in lines
+        assert 'test_seconds_bucket{route="/a",le="+Inf"} 1' in lines
+        assert 'test_seconds_count{route="/a"} 1' in lines
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values are escaped."""
+        counter = metrics.CounterMetric("test_total", "Test.", ("route",))
+        counter.inc('/a"b')
+
+        assert 'test_total{route="/a\\"b"} 1' in counter.render()
+
+
+class TestRequestStats:
+    """Test cases for per-request SQL accounting."""
+
+    def test_engine_hooks_record_queries(self):
+        """Test that statements run during a request are attributed to it."""
+        engine = create_engine("sqlite://")
+        metrics.instrument_engine(engine)
+
+        stats = metrics.RequestStats()
+        token = metrics._current_request.set(stats)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 1"))
+        finally:
+            metrics._current_request.reset(token)
+
+        assert stats.sql_count == 2
+        assert stats.statements["SELECT 1"] == 2
+
+    def test_repeated_statements_count_as_n_plus_one(self):
+        """Test that a statement repeated past the threshold is flagged."""
+        stats = metrics.RequestStats()
+        for _ in range(metrics.N_PLUS_ONE_THRESHOLD):
+            stats.record_query("SELECT * FROM companies WHERE id = ?", 0.001)
+
+        metrics.MetricsMiddleware._record("GET", "/n-plus-one", 200, 0.01, stats)
+
+        assert 'http_request_n_plus_one_total{method="GET",route="/n-plus-one"} 1' in (
+            metrics.render_metrics()
+        )
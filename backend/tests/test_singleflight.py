@@ -0,0 +1,200 @@
+"""
+Tests for single-flight coalescing of identical reads.
+"""
+import asyncio
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+import app.routes.companies as companies_routes
+from app.singleflight import SingleFlight
+
+
+def slow_work(calls, result=b"{}", delay=0.05):
+    """Build blocking work that counts its calls and takes a little while."""
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            calls.append(result)
+        threading.Event().wait(delay)
+        return result
+
+    return work
+
+
+class TestSingleFlight:
+    """Test cases for sharing in-flight and cached results."""
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        """Test that a burst of identical requests runs the work once."""
+        calls = []
+        flight = SingleFlight(enabled=True, cache_ms=0)
+
+        async def scenario():
+            work = slow_work(calls)
+            return await asyncio.gather(
+                *(flight.run("key", work) for _ in range(10))
+            )
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert {body for body, _ in results} == {b"{}"}
+        outcomes = [outcome for _, outcome in results]
+        assert outcomes.count("leader") == 1
+        assert outcomes.count("shared") == 9
+
+    def test_different_keys_run_separately(self):
+        """Test that requests with different keys do not share results."""
+        calls = []
+        flight = SingleFlight(enabled=True, cache_ms=0)
+
+        async def scenario():
+            return await asyncio.gather(
+                flight.run("a", slow_work(calls, b"a")),
+                flight.run("b", slow_work(calls, b"b")),
+            )
+
+        results = asyncio.run(scenario())
+        assert [body for body, _ in results] == [b"a", b"b"]
+        assert len(calls) == 2
+
+    def test_results_are_cached_briefly(self):
+        """Test that a finished result is reused within the cache window only."""
+        calls = []
+        flight = SingleFlight(enabled=True, cache_ms=50)
+
+        async def scenario():
+            work = slow_work(calls, delay=0)
+            first = await flight.run("key", work)
+            second = await flight.run("key", work)
+            await asyncio.sleep(0.1)
+            third = await flight.run("key", work)
+            return first, second, third
+
+        first, second, third = asyncio.run(scenario())
+        assert [first[1], second[1], third[1]] == ["leader", "cached", "leader"]
+        assert len(calls) == 2
+
+    def test_invalidate_drops_cached_and_in_flight_results(self):
+        """Test that reads after a write do not reuse earlier results."""
+        calls = []
+        flight = SingleFlight(enabled=True, cache_ms=1000)
+
+        async def scenario():
+            work = slow_work(calls)
+            before = asyncio.ensure_future(flight.run("key", work))
+            await asyncio.sleep(0.01)
+            flight.invalidate()
+            after = await flight.run("key", work)
+            await before
+            again = await flight.run("key", work)
+            return after, again
+
+        after, again = asyncio.run(scenario())
+        assert after[1] == "leader"
+        # Only the post-write result may be cached
+        assert again[1] == "cached"
+        assert len(calls) == 2
+
+    def test_errors_are_shared_but_not_cached(self):
+        """Test that a failure reaches every waiter and the next call retries."""
+        calls = []
+        flight = SingleFlight(enabled=True, cache_ms=1000)
+
+        def failing():
+            calls.append(None)
+            threading.Event().wait(0.05)
+            raise RuntimeError("database down")
+
+        async def scenario():
+            results = await asyncio.gather(
+                *(flight.run("key", failing) for _ in range(3)),
+                return_exceptions=True,
+            )
+            retry = await flight.run("key", slow_work(calls, delay=0))
+            return results, retry
+
+        results, retry = asyncio.run(scenario())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert retry == (b"{}", "leader")
+        assert len(calls) == 2
+
+    def test_disabled_runs_every_request(self):
+        """Test that coalescing is a no-op when disabled."""
+        calls = []
+        flight = SingleFlight(enabled=False)
+
+        async def scenario():
+            work = slow_work(calls, delay=0)
+            return [await flight.run("key", work) for _ in range(3)]
+
+        assert asyncio.run(scenario()) == [(b"{}", None)] * 3
+        assert len(calls) == 3
+
+    def test_cache_is_bounded(self):
+        """Test that the micro-cache evicts the oldest keys past its size."""
+        flight = SingleFlight(enabled=True, cache_ms=1000, max_entries=2)
+
+        async def scenario():
+            for key in ("a", "b", "c"):
+                await flight.run(key, lambda: b"{}")
+
+        asyncio.run(scenario())
+        assert list(flight._cache) == ["b", "c"]
+
+
+class TestCoalescedResponse:
+    """Test cases for the sessions coalesced endpoint work runs on."""
+
+    def test_shared_work_outlives_the_leaders_session(self, monkeypatch):
+        """Test that cancelling the leader does not close the shared work's session."""
+        monkeypatch.setattr(
+            companies_routes, "single_flight", SingleFlight(enabled=True, cache_ms=0)
+        )
+        engine = create_engine("sqlite://")
+        leader_db = Session(bind=engine)
+        follower_db = Session(bind=engine)
+        started = threading.Event()
+        release = threading.Event()
+        sessions = []
+
+        def load(session):
+            sessions.append(session)
+            started.set()
+            release.wait(5)
+            return str(session.scalar(text("SELECT 1"))).encode()
+
+        def request():
+            return Request(
+                {
+                    "type": "http",
+                    "path": "/api/companies/",
+                    "query_string": b"",
+                    "headers": [],
+                }
+            )
+
+        async def scenario():
+            leader = asyncio.ensure_future(
+                companies_routes._coalesced_response(request(), leader_db, load)
+            )
+            await asyncio.to_thread(started.wait, 5)
+            follower = asyncio.ensure_future(
+                companies_routes._coalesced_response(request(), follower_db, load)
+            )
+            await asyncio.sleep(0)
+            # What get_db does when the leader's client disconnects
+            leader.cancel()
+            leader_db.close()
+            release.set()
+            return await follower
+
+        response = asyncio.run(scenario())
+        assert response.body == b"1"
+        assert response.headers["Single-Flight"] == "shared"
+        assert len(sessions) == 1
+        assert sessions[0] is not leader_db
+        assert sessions[0].get_bind() is engine
@@ -0,0 +1,101 @@
+"""
+Tests for the slow-query log.
+"""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+
+from app import metrics, slow_queries
+from app.routes import admin
+from app.slow_queries import SlowQueryLog
+
+
+class TestSlowQueryLog:
+    """Test cases for slow statement aggregation."""
+
+    def test_record_aggregates_by_statement(self):
+        """Test that repeated statements share one entry regardless of whitespace."""
+        log = SlowQueryLog(max_entries=10)
+        log.record("SELECT *\n  FROM companies", 120.0, "()")
+        log.record("SELECT * FROM companies", 80.0, "()")
+
+        [entry] = log.worst()
+        assert entry.statement == "SELECT * FROM companies"
+        assert entry.count == 2
+        assert entry.max_ms == 120.0
+        assert entry.mean_ms == 100.0
+
+    def test_worst_orders_by_requested_aggregate(self):
+        """Test ranking of slow statements."""
+        log = SlowQueryLog(max_entries=10)
+        log.record("SELECT 1", 500.0, "()")
+        for _ in range(10):
+            log.record("SELECT 2", 100.0, "()")
+
+        assert log.worst(order_by="total_ms")[0].statement == "SELECT 2"
+        assert log.worst(order_by="max_ms")[0].statement == "SELECT 1"
+
+    def test_evicts_mildest_entry_when_full(self):
+        """Test that the log stays bounded."""
+        log = SlowQueryLog(max_entries=2)
+        log.record("SELECT 1", 300.0, "()")
+        log.record("SELECT 2", 100.0, "()")
+        log.record("SELECT 3", 200.0, "()")
+
+        statements = {entry.statement for entry in log.worst()}
+        assert statements == {"SELECT 1", "SELECT 3"}
+
+    def test_engine_hooks_record_slow_statements(self, monkeypatch):
+        """Test that statements over the threshold reach the log."""
+        monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+        monkeypatch.setattr(slow_queries, "slow_query_log", SlowQueryLog())
+        engine = create_engine("sqlite://")
+        slow_queries.instrument_engine(engine)
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT :value"), {"value": 42})
+
+        [entry] = slow_queries.slow_query_log.worst()
+        assert entry.statement == "SELECT ?"
+        assert entry.last_parameters == "(42,)"
+        assert entry.plan is None
+
+    def test_shares_timing_hooks_with_metrics(self, monkeypatch):
+        """Test that both instrumentations time statements through one hook."""
+        monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+        monkeypatch.setattr(slow_queries, "slow_query_log", SlowQueryLog())
+        engine = create_engine("sqlite://")
+        metrics.instrument_engine(engine)
+        slow_queries.instrument_engine(engine)
+
+        stats = metrics.RequestStats()
+        token = metrics._current_request.set(stats)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                assert connection.info["query_timing_start"] == []
+        finally:
+            metrics._current_request.reset(token)
+
+        assert stats.sql_count == 1
+        [entry] = slow_queries.slow_query_log.worst()
+        assert entry.statement == "SELECT 1"
+        assert entry.count == 1
+
+
+class TestAdminToken:
+    """Test cases for guarding the admin endpoints."""
+
+    def test_rejects_requests_without_configured_token(self, monkeypatch):
+        """Test that admin endpoints stay closed when no token is configured."""
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+        with pytest.raises(HTTPException) as excinfo:
+            admin.require_admin_token(None)
+        assert excinfo.value.status_code == 403
+
+    def test_checks_configured_token(self, monkeypatch):
+        """Test that only the configured token is accepted."""
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+        admin.require_admin_token("secret")
+        with pytest.raises(HTTPException):
+            admin.require_admin_token("wrong")
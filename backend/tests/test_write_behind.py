@@ -0,0 +1,210 @@
+"""
+Tests for the write-behind create queue.
+"""
+import asyncio
+import itertools
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import write_behind
+from app.singleflight import SingleFlight
+from app.write_behind import QueueClosedError, QueueFullError, WriteBehindQueue
+
+
+def make_queue(batches, writer=None, **kwargs):
+    """Build a queue whose writer records batches instead of hitting the database."""
+    ids = itertools.count(1)
+
+    def reserve(count):
+        return [next(ids) for _ in range(count)]
+
+    def record(rows, synchronous_commit):
+        batches.append((rows, synchronous_commit))
+
+    kwargs.setdefault("flush_interval_ms", 5)
+    kwargs.setdefault("id_block_size", 10)
+    kwargs.setdefault("retry_backoff_ms", 1)
+    return WriteBehindQueue(id_reserver=reserve, writer=writer or record, **kwargs)
+
+
+def failing_writer(batches, failures):
+    """Writer that raises the next queued failure for matching rows."""
+
+    def writer(rows, synchronous_commit):
+        for match, exc in failures:
+            if any(match(row) for row in rows):
+                failures.remove((match, exc))
+                raise exc
+        batches.append((rows, synchronous_commit))
+
+    return writer
+
+
+class TestWriteBehindQueue:
+    """Test cases for batching, ID allocation and shutdown."""
+
+    def test_concurrent_creates_are_group_committed(self):
+        """Test that concurrent submits share one batch and get distinct IDs."""
+        batches = []
+
+        async def scenario():
+            queue = make_queue(batches, batch_size=50)
+            await queue.start()
+            rows = await asyncio.gather(
+                *(queue.submit({"name": f"Company {i}"}) for i in range(20))
+            )
+            await queue.stop()
+            return rows
+
+        rows = asyncio.run(scenario())
+        assert sorted(row["id"] for row in rows) == list(range(1, 21))
+        assert len(batches) == 1
+        assert len(batches[0][0]) == 20
+        assert batches[0][1] is True
+
+    def test_batches_are_capped_at_batch_size(self):
+        """Test that a burst is split into batches of at most batch_size."""
+        batches = []
+
+        async def scenario():
+            queue = make_queue(batches, batch_size=4)
+            await queue.start()
+            await asyncio.gather(*(queue.submit({"name": "x"}) for _ in range(10)))
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert all(len(rows) <= 4 for rows, _ in batches)
+        assert sum(len(rows) for rows, _ in batches) == 10
+
+    def test_async_commit_relaxes_synchronous_commit(self):
+        """Test that async_commit mode asks the writer not to wait for the WAL."""
+        batches = []
+
+        async def scenario():
+            queue = make_queue(batches, durability="async_commit")
+            await queue.start()
+            await queue.submit({"name": "x"})
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert batches[0][1] is False
+
+    def test_stop_flushes_enqueued_writes(self):
+        """Test that writes acknowledged on enqueue are flushed on shutdown."""
+        batches = []
+
+        async def scenario():
+            queue = make_queue(batches, durability="enqueue", flush_interval_ms=1000)
+            await queue.start()
+            for _ in range(3):
+                await queue.submit({"name": "x"})
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert sum(len(rows) for rows, _ in batches) == 3
+
+    def test_full_queue_applies_backpressure(self):
+        """Test that submits fail once the queue stays full past the timeout."""
+
+        async def scenario():
+            queue = make_queue(
+                [], durability="enqueue", max_pending=1, enqueue_timeout_ms=10
+            )
+            # Hold the writer so nothing drains
+            queue._queue = asyncio.Queue(maxsize=1)
+            queue._id_lock = asyncio.Lock()
+            queue._task = asyncio.get_running_loop().create_future()
+            await queue.submit({"name": "x"})
+            with pytest.raises(QueueFullError):
+                await queue.submit({"name": "y"})
+
+        asyncio.run(scenario())
+
+    def test_submit_after_stop_is_rejected(self):
+        """Test that a stopped queue refuses new writes."""
+
+        async def scenario():
+            queue = make_queue([])
+            await queue.start()
+            await queue.stop()
+            with pytest.raises(QueueClosedError):
+                await queue.submit({"name": "x"})
+
+        asyncio.run(scenario())
+
+    def test_transient_errors_are_retried(self):
+        """Test that a batch hit by a lost connection is retried as a whole."""
+        batches = []
+        lost = OperationalError("INSERT", {}, Exception("connection reset"))
+        writer = failing_writer(batches, [(lambda row: True, lost)])
+
+        async def scenario():
+            queue = make_queue(batches, writer=writer, batch_size=10)
+            await queue.start()
+            await asyncio.gather(*(queue.submit({"name": "x"}) for _ in range(3)))
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert [len(rows) for rows, _ in batches] == [3]
+
+    def test_bad_row_only_fails_its_own_create(self):
+        """Test that a rejected batch falls back to writing rows one by one."""
+        batches = []
+        duplicate = IntegrityError("INSERT", {}, Exception("duplicate key"))
+        failures = [(lambda row: row["name"] == "bad", duplicate)] * 2
+        writer = failing_writer(batches, failures)
+
+        async def scenario():
+            queue = make_queue(batches, writer=writer, batch_size=10)
+            await queue.start()
+            results = await asyncio.gather(
+                *(queue.submit({"name": name}) for name in ("a", "bad", "b")),
+                return_exceptions=True,
+            )
+            await queue.stop()
+            return results
+
+        good, bad, other = asyncio.run(scenario())
+        assert isinstance(bad, IntegrityError)
+        assert good["name"] == "a" and other["name"] == "b"
+        assert sorted(rows[0]["name"] for rows, _ in batches) == ["a", "b"]
+
+    def test_enqueued_rows_survive_a_failed_batch(self):
+        """Test that acknowledged writes are not dropped with a failing batch."""
+        batches = []
+        duplicate = IntegrityError("INSERT", {}, Exception("duplicate key"))
+        failures = [(lambda row: row["name"] == "bad", duplicate)] * 2
+        writer = failing_writer(batches, failures)
+
+        async def scenario():
+            queue = make_queue(
+                batches, writer=writer, durability="enqueue", flush_interval_ms=50
+            )
+            await queue.start()
+            for name in ("a", "bad", "b"):
+                await queue.submit({"name": name})
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert sorted(rows[0]["name"] for rows, _ in batches) == ["a", "b"]
+
+    def test_written_batches_invalidate_single_flight(self, monkeypatch):
+        """Test that reads cached before an enqueued write commits are dropped."""
+        batches = []
+        flight = SingleFlight(enabled=True, cache_ms=60000)
+        monkeypatch.setattr(write_behind, "single_flight", flight)
+
+        async def scenario():
+            queue = make_queue(batches, durability="enqueue", flush_interval_ms=50)
+            await queue.start()
+            await queue.submit({"name": "a"})
+            # A list read between the 202 and the batch commit
+            await flight.run("list", lambda: b"[]")
+            cached_before_flush = "list" in flight._cache
+            await queue.stop()
+            return cached_before_flush
+
+        assert asyncio.run(scenario())
+        assert len(batches) == 1
+        assert "list" not in flight._cache